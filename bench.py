@@ -0,0 +1,143 @@
+"""bench.py: measures the speed of the full simulation over a grid of sizes and compares runs against baselines
+
+Every configuration runs in a fresh worker process, one at a time, so peak RSS belongs to that configuration
+alone and runs do not compete for cores. The best of --repeat runs is kept.
+
+Usage:
+  bench.py (--help | -h)
+  bench.py run [options] [<grid>]
+  bench.py compare [--threshold=<t>] <baseline> <results>
+
+Arguments:
+  <grid>                JSON object, or path to a JSON file, mapping option names (see driver.DEFAULTS) to lists
+                        of values; default: the GRID below
+                        e.g. '{"CONSENSUS": ["pbft-serial", "pbft"]}' compares the per message and the
+                        batched processing of PBFT
+  <baseline>            results saved by "bench.py run --out"
+  <results>             results to check against the baseline
+
+Options:
+  --rounds=<n>          rounds simulated per configuration [default: 10]
+  --repeat=<n>          runs per configuration; the fastest is kept [default: 3]
+  --seed=<seed>         random seed [default: 42]
+  --out=<file>          save the results as JSON, e.g. as a baseline
+  --threshold=<t>       relative slowdown flagged as a regression [default: 0.1]
+  --help                show this
+"""
+
+import driver
+import solver
+
+from docopt import docopt
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import time
+
+GRID = {"PLAYERS":               [[[50, 1]], [[100, 1]], [[200, 1]]],
+        "N_CONNECTIONS":         [4, 8],
+        "N_HEARTBEATS_IN_ROUND": [5],
+        "P_TRANSACTIONS":        [0.1, 0.5]}
+
+# metric name and whether larger values are better
+METRICS = [("HEARTBEATS_PER_SEC", True),
+           ("MESSAGES_PER_SEC",   True),
+           ("SECONDS_PER_BLOCK",  False),
+           ("PEAK_RSS_MB",        False)]
+
+def measure(opts):
+    """Runs one configuration and returns its metrics"""
+
+    sol   = solver.Solver(opts)
+    start = time.perf_counter()
+    sol.simulate()
+    seconds = time.perf_counter() - start
+
+    blocks = sol.blockchain.height+1 if sol.blockchain is not None else 0
+
+    return {"SECONDS":            round(seconds, 4),
+            "HEARTBEATS_PER_SEC": sol.nHeartbeats/seconds,
+            "MESSAGES_PER_SEC":   sol.gossip.delivered()/seconds,
+            "SECONDS_PER_BLOCK":  seconds/blocks if blocks else None,
+            "COMMON_BLOCKS":      blocks,
+            "PEAK_RSS_MB":        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss/1024} # kilobytes on linux
+
+def runOne(opts, repeat):
+    """Runs opts repeat times, each in a fresh process, and returns the metrics of the fastest run"""
+
+    best = None
+    for i in range(repeat):
+        with multiprocessing.Pool(1, maxtasksperchild=1) as pool:
+            metrics = pool.apply(measure, (opts,))
+        if best is None or metrics["SECONDS"] < best["SECONDS"]:
+            best = metrics
+
+    return best
+
+def run(grid, rounds, repeat, seed):
+    """Benchmarks every combination of the values in grid and returns the results"""
+
+    import sweep
+
+    names   = sorted(grid)
+    results = []
+    for opts in sweep.expand(grid, [seed], dict(driver.DEFAULTS, N_ROUNDS=rounds)):
+        params = dict((i, opts[i]) for i in names)
+        opts["PLAYERS"] = [tuple(i) for i in opts["PLAYERS"]]
+
+        metrics = runOne(opts, repeat)
+        results.append({"params": params, "metrics": metrics})
+        print(json.dumps(params), " ".join("%s=%.4g" % (i, metrics[i]) for i, _ in METRICS if metrics[i] is not None),
+              file=sys.stderr)
+
+    return {"machine": platform.node(), "python": platform.python_version(), "rounds": rounds, "seed": seed,
+            "results": results}
+
+def compare(baseline, results, threshold):
+    """Returns a list of (params, metric, baseline value, value, relative change) for every metric of results
+       that is worse than in baseline by more than threshold"""
+
+    base = dict((json.dumps(i["params"], sort_keys=True), i["metrics"]) for i in baseline["results"])
+
+    regressions = []
+    for i in results["results"]:
+        old = base.get(json.dumps(i["params"], sort_keys=True))
+        if old is None:
+            continue
+
+        for name, larger in METRICS:
+            a, b = old.get(name), i["metrics"].get(name)
+            if not a or b is None:
+                continue
+
+            change = (b-a)/a
+            if (-change if larger else change) > threshold:
+                regressions.append((i["params"], name, a, b, change))
+
+    return regressions
+
+if __name__=="__main__":
+    args = docopt(__doc__)
+
+    if args["compare"]:
+        regressions = compare(json.load(open(args["<baseline>"])), json.load(open(args["<results>"])),
+                              float(args["--threshold"]))
+        for params, name, a, b, change in regressions:
+            print("REGRESSION %s %s: %.4g -> %.4g (%+.1f%%)" % (json.dumps(params), name, a, b, 100*change))
+        if not regressions:
+            print("no regressions beyond %s%%" % (100*float(args["--threshold"])))
+        sys.exit(1 if regressions else 0)
+
+    spec = args["<grid>"]
+    grid = GRID if spec is None else json.load(open(spec)) if os.path.exists(spec) else json.loads(spec)
+
+    results = run(grid, int(args["--rounds"]), int(args["--repeat"]), int(args["--seed"]))
+
+    if args["--out"]:
+        with open(args["--out"], "w") as f:
+            json.dump(results, f, indent=1)
+    else:
+        json.dump(results, sys.stdout, indent=1)
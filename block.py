@@ -1,11 +1,31 @@
 """This module defines a Block class, which represents a block on the blockchain.
 """
 
+import hashlib
+
+GENESIS = bytes(32) # digest of the empty chain
+
+def merkleRoot(txs):
+    """Returns the Merkle root of the digests of txs. The leaves are sorted, so the root does not depend on the
+       order of the transactions (blocks with the same set of transactions are equal)"""
+
+    level = sorted(set(i.digest for i in txs))
+    if not level:
+        return hashlib.sha256(b"").digest()
+
+    while len(level) > 1:
+        if len(level) % 2:
+            level.append(level[-1])
+        level = [hashlib.sha256(level[i] + level[i+1]).digest() for i in range(0, len(level), 2)]
+
+    return level[0]
+
 class Block:
     id = 0
     
     def __init__(self, txs, next=None, id=-1, proposer=None):
-        """Creates a new Block object given a list of transactions txs"""
+        """Creates a new Block object given a list of transactions txs on top of the block next. The digest
+           is computed once from the transactions and the digest of next, so next must not be changed later"""
 
         if id == -1:
             self.id = Block.id
@@ -13,38 +33,52 @@ class Block:
         else:
             self.id = id
         
-        self.next = next # next block in blockchain
-        self.txs = txs   # list of transactions
+        self.next = next       # next block in blockchain
+        self.txs  = tuple(txs) # transactions; blocks are immutable
+
+        self.proposer = proposer # id of the proposer of the block
+        self.height   = next.height+1 if next is not None else 0 # number of blocks below this one
 
-        self.proposer   = proposer # proposer of the block
+        # content hash of the whole chain ending in this block
+        self.digest = hashlib.sha256(merkleRoot(txs) + (next.digest if next is not None else GENESIS)).digest()
 
     def copy(self):
         new = Block(self.txs, self.next, self.id, self.proposer)
         
         return new
 
+    def rebase(self, next):
+        """Returns a copy of the block on top of the block next"""
+
+        return Block(self.txs, next, self.id, self.proposer)
+
     def __eq__(self, other):
-        """Equality for Block objects is defined as having the same transactions"""
+        """Equality for Block objects is defined as having the same transactions and the same chain below,
+           i.e. the same digest"""
 
-        if other == None:
+        if not isinstance(other, Block):
             return False
-        
-        selfIds = [i.id for i in self.txs]
-        otherIds = [i.id for i in other.txs]
 
-        return set(selfIds) == set(otherIds) and self.next == other.next
+        return self.digest == other.digest
 
     def __hash__(self):
-        """Hash"""
+        """Hash derived from the digest"""
 
-        return self.id
+        return int.from_bytes(self.digest[:8], "big")
+
+    def chain(self):
+        """Iterates over the blocks of the chain ending in this block, from this block down"""
+
+        curr = self
+        while curr is not None:
+            yield curr
+            curr = curr.next
 
     def __str__(self):
         """Str representation: block n: transaction x_i; validators: p_i
                                str(block n-1)"""
-        if self.next == None:
-            return "block %s: "%(self.id)+", ".join([str(i) for i in self.txs])
-        return "block %s: "%(self.id) + ", ".join([str(i) for i in self.txs]) + "\n" + str(self.next)
+
+        return "\n".join(["block %s: "%(i.id) + ", ".join([str(j) for j in i.txs]) for i in self.chain()])
 
     def __repr__(self):
         return self.__str__()
@@ -0,0 +1,54 @@
+"""This module defines the BlockStore class, a single append-only store of immutable blocks shared by all players.
+
+Blocks are interned by digest: a block that several players commit on top of the same chain exists once, and
+every player only keeps a reference to the tip of its chain.
+"""
+
+import block
+
+class BlockStore:
+    def __init__(self):
+        """Creates an empty BlockStore"""
+
+        self.blocks = {} # map of block digest to block
+
+    def add(self, nBlock):
+        """Adds nBlock to the store and returns the stored block with the same digest"""
+
+        return self.blocks.setdefault(nBlock.digest, nBlock)
+
+    def extend(self, txs, parent, id=-1, proposer=None):
+        """Returns the stored block with transactions txs on top of the block parent, creating it if needed"""
+
+        return self.add(block.Block(txs, next=parent, id=id, proposer=proposer))
+
+    def rebase(self, nBlock, parent):
+        """Returns the stored copy of nBlock on top of the block parent"""
+
+        if nBlock.next is parent and nBlock.height == (parent.height+1 if parent is not None else 0):
+            return self.add(nBlock)
+
+        return self.extend(nBlock.txs, parent, nBlock.id, nBlock.proposer)
+
+    def prune(self, final, depth=0):
+        """Drops every block at or below the height of the block final, except final and the depth blocks below
+           it, and unlinks the chain below the oldest kept block. Must only be called once all players agree on
+           final, so that no chain references a dropped block"""
+
+        keep = {}
+        for i in final.chain():
+            keep[i.digest] = i
+            if len(keep) > depth:
+                i.next = None # the digest was computed from the parent already
+                break
+
+        self.blocks = {d: b for d, b in self.blocks.items() if b.height > final.height or d in keep}
+
+    def get(self, digest):
+        return self.blocks.get(digest)
+
+    def __contains__(self, digest):
+        return digest in self.blocks
+
+    def __len__(self):
+        return len(self.blocks)
@@ -0,0 +1,214 @@
+"""This module defines the ShardedEngine class, which runs the "bsp" engine: a bulk-synchronous parallel simulation
+whose players are partitioned into SHARDS contiguous ranges of ids, each simulated by its own worker process.
+
+Every heartbeat is a superstep. Players send into an outbox instead of into the inboxes of their peers, and the
+outboxes are delivered at the barrier between two heartbeats, in the order of the sender ids, so a message is
+consumed no earlier than the heartbeat after the one it was sent in. Every player draws from its own generators
+and allocates ids from its own range (context.PlayerContext). Results therefore depend only on the seed, not on
+SHARDS; with SHARDS = 1 everything runs in the solver's process.
+
+The solver's process coordinates: it chooses proposers and validators, pays out and checks the common chain as
+usual. Per heartbeat it sends every worker the round's proposers, the stakes after payouts and the messages for
+its players. It receives back the messages of the worker's players, their new chain tips, and the blocks the
+coordinator has not seen yet. BLOCK messages only carry a digest, so the blocks they refer to cross processes
+with them, pickled as their contents and parent digest, and are rebuilt on top of the receiving worker's copy
+of the parent.
+"""
+
+import block
+import message
+
+import copyreg
+import io
+import multiprocessing
+import pickle
+
+_store = None # block store of this worker process, used to rebuild received blocks
+
+def rebuildBlock(txs, id, proposer, height, digest, parentDigest):
+    """Rebuilds a block sent by another shard on top of the local copy of its parent, or without a parent if
+       there is no local copy (blocks are only ever rebased onto a local chain, see BlockStore.rebase), and
+       returns the stored block"""
+
+    parent = None if parentDigest == block.GENESIS else _store.get(parentDigest)
+    if parent is not None or parentDigest == block.GENESIS:
+        return _store.extend(txs, parent, id, proposer)
+
+    nBlock = block.Block.__new__(block.Block)
+    nBlock.__dict__.update(id=id, next=None, txs=txs, proposer=proposer, height=height, digest=digest)
+    return _store.add(nBlock)
+
+def reduceBlock(nBlock):
+    parentDigest = nBlock.next.digest if nBlock.next is not None else block.GENESIS
+    return rebuildBlock, (nBlock.txs, nBlock.id, nBlock.proposer, nBlock.height, nBlock.digest, parentDigest)
+
+def dumps(obj):
+    """Pickles obj for another shard, sending blocks without the chain below them"""
+
+    f = io.BytesIO()
+    p = pickle.Pickler(f, pickle.HIGHEST_PROTOCOL)
+    p.dispatch_table = copyreg.dispatch_table.copy()
+    p.dispatch_table[block.Block] = reduceBlock
+    p.dump(obj)
+
+    return f.getvalue()
+
+def outboxBlob(sol, batches):
+    """Pickles the outbox entries in batches for another shard, with the blocks their BLOCK messages refer to"""
+
+    blocks = {}
+    for senderId, j, msgs, times in batches:
+        for msg in msgs:
+            if msg.type == message.Message.MessageType.BLOCK:
+                blocks[msg.value] = sol.blockStore.get(msg.value)
+
+    return dumps((list(blocks.values()), batches))
+
+def deliver(sol, batches):
+    """Delivers the outbox entries (sender id, recipient id, messages, arrival times) in batches, in order"""
+
+    players = sol.players
+    for senderId, j, msgs, times in batches:
+        players[j].deliver(msgs, times, senderId)
+
+class ShardedEngine:
+    def __init__(self, sol, nShards):
+        """Creates the engine of the solver sol with nShards shards"""
+
+        self.sol     = sol
+        self.nShards = nShards
+        self.bounds  = [sol.N_PLAYERS*i//nShards for i in range(nShards+1)] # shard i has ids bounds[i]:bounds[i+1]
+
+        self.workers = [] # (process, connection) per shard, started by the first step
+        self.pending = [] # pickled messages of the last heartbeat, pending[src][dst]
+        self.final   = None # digest of the last finalized block, to prune the workers with
+
+    def step(self, heartbeat):
+        """Delivers the messages of the last heartbeat and runs the actions of all players for heartbeat"""
+
+        sol = self.sol
+        if self.nShards == 1:
+            batches, sol.outbox = sol.outbox, []
+            deliver(sol, batches)
+            for i in sol.players:
+                i.action(heartbeat)
+            return
+
+        if not self.workers:
+            self.start()
+
+        roundStart = heartbeat % sol.N_HEARTBEATS_IN_ROUND == 0
+        for dst, (process, conn) in enumerate(self.workers):
+            conn.send((heartbeat,
+                       sol.propSet if roundStart else None,
+                       (sol.ledger.stakes, sol.ledger.total) if roundStart else None,
+                       self.final,
+                       [i[dst] for i in self.pending])) # source shards in order, so senders stay in id order
+        self.final = None
+
+        self.pending = []
+        for process, conn in self.workers:
+            blobs, blocks, tips = conn.recv()
+            self.pending.append(blobs)
+
+            for txs, id, proposer, parentDigest in blocks: # oldest first, so parents are stored already
+                sol.blockStore.extend(txs, sol.blockStore.get(parentDigest), id, proposer)
+            for i, digest in tips:
+                sol.players[i].blockchain = sol.blockStore.get(digest)
+
+    def prune(self, final):
+        """Prunes the workers up to the block final before their next heartbeat"""
+
+        self.final = final.digest
+
+    def start(self):
+        workers = [] # assigned once all are started, so that the solver still pickles for spawned workers
+        for i in range(self.nShards):
+            conn, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=work, args=(child, self.sol, self.bounds, i), daemon=True)
+            process.start()
+            child.close()
+            workers.append((process, conn))
+
+        self.workers = workers
+
+    def close(self):
+        """Stops the workers and adds their gossip counters to the solver's"""
+
+        stats = self.sol.gossip
+        for process, conn in self.workers:
+            conn.send(None)
+            unique, sent, redundant, dropped = conn.recv()
+            stats.unique    += unique
+            stats.sent      += sent
+            stats.redundant += redundant
+            stats.dropped   += dropped
+            process.join()
+
+        self.workers = []
+
+    def __getstate__(self):
+        if self.workers:
+            raise RuntimeError("cannot pickle a running sharded engine")
+        return self.__dict__
+
+def work(conn, sol, bounds, shard):
+    """Main loop of the worker process of shard: simulates the players with ids bounds[shard]:bounds[shard+1]"""
+
+    global _store
+    _store = sol.blockStore
+
+    owner   = [j for j in range(len(bounds)-1) for i in range(bounds[j], bounds[j+1])] # shard of every player id
+    players = sol.players[bounds[shard]:bounds[shard+1]]
+
+    sol.outbox = []
+    tips       = dict((i.id, i.blockchain) for i in players) # last reported chain tip per player
+    reported   = set()                                        # digests of the blocks the coordinator has
+
+    while True:
+        cmd = conn.recv()
+        if cmd is None:
+            stats = sol.gossip
+            conn.send((stats.unique, stats.sent, stats.redundant, stats.dropped))
+            return
+
+        heartbeat, propSet, stakes, final, blobs = cmd
+
+        sol.heartbeat = heartbeat
+        if propSet is not None:
+            sol.propSet = propSet
+        if stakes is not None:
+            sol.ledger.stakes[:] = stakes[0]
+            sol.ledger.total     = stakes[1]
+        if final is not None and sol.blockStore.get(final) is not None:
+            sol.prune(sol.blockStore.get(final))
+
+        for blob in blobs:
+            blocks, batches = pickle.loads(blob) # unpickling stores the blocks
+            deliver(sol, batches)
+
+        for i in players:
+            i.action(heartbeat)
+
+        outboxes = [[] for i in range(len(bounds)-1)]
+        for entry in sol.outbox:
+            outboxes[owner[entry[1]]].append(entry)
+        sol.outbox = []
+
+        # new chain tips and the blocks below them that were not reported yet
+        blocks, changed = [], []
+        for i in players:
+            if i.blockchain is tips[i.id]:
+                continue
+            tips[i.id] = i.blockchain
+            changed.append((i.id, i.blockchain.digest))
+
+            new = []
+            for b in i.blockchain.chain():
+                if b.digest in reported:
+                    break
+                reported.add(b.digest)
+                new.append((b.txs, b.id, b.proposer, b.next.digest if b.next is not None else block.GENESIS))
+            blocks.extend(reversed(new))
+
+        conn.send(([outboxBlob(sol, i) for i in outboxes], blocks, changed))
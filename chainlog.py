@@ -0,0 +1,137 @@
+"""This module defines the ChainLog class, which streams chain events to CHAIN_FILE while the simulation runs:
+
+  commit: a player committed a block; its id, height, proposer and digest
+  common: a block became part of the common chain; the same fields, the parent digest and its transactions
+
+Every block becomes common once, so the file holds each common block's contents once and grows linearly with the
+run. It is written in CHAIN_FORMAT "jsonl" (one JSON object per line) or "bin" (fixed-size records, each common
+record followed by its transactions), and flushed every heartbeat, so it can be tailed while the simulation
+runs. readRecords() reads either format back as dicts.
+
+Snapshots keep the path and length of the chain file; a resumed run cuts the file back to that length and
+continues it, so it ends up as if the run had never been interrupted.
+"""
+
+import block
+
+import json
+import os
+import struct
+
+FORMATS = ("jsonl", "bin")
+
+MAGIC = b"POSCHAIN1" # first bytes of bin files
+
+COMMIT, COMMON = 0, 1
+EVENTS = {COMMIT: "commit", COMMON: "common"}
+
+# bin record: event, heartbeat, player (-1 for common), block id, height, proposer, digest, parent digest, txs
+RECORD = struct.Struct("<Bqiqqq32s32sI")
+TX     = struct.Struct("<qqqd") # id, sender, recipient, fee
+
+class ChainLog:
+    def __init__(self, path, format="jsonl", offset=None):
+        """Creates a ChainLog writing to path in format. If offset is given, the existing file is cut to offset
+           bytes and continued instead (e.g. on resume)"""
+
+        if format not in FORMATS:
+            raise ValueError("unknown chain format %s; expected one of %s" % (format, ", ".join(FORMATS)))
+
+        self.path   = path
+        self.format = format
+
+        if offset is not None and os.path.exists(path):
+            self.file = open(path, "r+b")
+            self.file.truncate(offset)
+            self.file.seek(offset)
+        else:
+            self.file = open(path, "wb")
+
+        if format == "bin" and self.file.tell() == 0:
+            self.file.write(MAGIC)
+
+        self.offset = self.file.tell() # bytes written, as of the last snapshot
+
+    @staticmethod
+    def fromOpts(opts, resumed=None):
+        """Returns the ChainLog configured by the CHAIN_* options, or None if CHAIN_FILE is not set. resumed: the
+           ChainLog of a snapshot, continued if it wrote to the same file"""
+
+        if not opts.get("CHAIN_FILE"):
+            return None
+
+        offset = resumed.offset if resumed is not None and resumed.path == opts["CHAIN_FILE"] else None
+        return ChainLog(opts["CHAIN_FILE"], opts.get("CHAIN_FORMAT", "jsonl"), offset)
+
+    def commit(self, nBlock, heartbeat, player):
+        """Records that player committed nBlock at heartbeat"""
+
+        self.write(COMMIT, heartbeat, player, nBlock, ())
+
+    def common(self, blocks, heartbeat):
+        """Records that blocks, oldest first, became part of the common chain at heartbeat"""
+
+        for i in blocks:
+            self.write(COMMON, heartbeat, -1, i, i.txs)
+
+    def write(self, event, heartbeat, player, nBlock, txs):
+        parent   = nBlock.next.digest if nBlock.next is not None else block.GENESIS
+        proposer = nBlock.proposer if nBlock.proposer is not None else -1
+
+        if self.format == "bin":
+            self.file.write(RECORD.pack(event, heartbeat, player, nBlock.id, nBlock.height, proposer, nBlock.digest,
+                                        parent, len(txs)))
+            for i in txs:
+                self.file.write(TX.pack(i.id, i.senderId, i.recipId, i.fee))
+            return
+
+        record = {"event": EVENTS[event], "heartbeat": heartbeat, "block": nBlock.id, "height": nBlock.height,
+                  "proposer": proposer, "digest": nBlock.digest.hex()}
+        if event == COMMIT:
+            record["player"] = player
+        else:
+            record["parent"] = parent.hex()
+            record["txs"]    = [[i.id, i.senderId, i.recipId, i.fee] for i in txs]
+        self.file.write((json.dumps(record) + "\n").encode())
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+    def __getstate__(self):
+        """Snapshots keep the path and the length written so far, not the open file"""
+
+        if self.file is not None and not self.file.closed:
+            self.file.flush()
+            self.offset = self.file.tell()
+        state = dict(self.__dict__)
+        state["file"] = None
+
+        return state
+
+def readRecords(path):
+    """Yields the records of the chain file at path, in either format, as dicts like the jsonl lines"""
+
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            f.seek(0)
+            for line in f:
+                yield json.loads(line)
+            return
+
+        while True:
+            data = f.read(RECORD.size)
+            if len(data) < RECORD.size:
+                return
+
+            event, heartbeat, player, id, height, proposer, digest, parent, nTxs = RECORD.unpack(data)
+            record = {"event": EVENTS[event], "heartbeat": heartbeat, "block": id, "height": height,
+                      "proposer": proposer, "digest": digest.hex()}
+            if event == COMMIT:
+                record["player"] = player
+            else:
+                record["parent"] = parent.hex()
+                record["txs"]    = [list(TX.unpack(f.read(TX.size))) for i in range(nTxs)]
+            yield record
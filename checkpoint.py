@@ -0,0 +1,128 @@
+"""checkpoint.py: saves and loads snapshots of a running simulation, and forks variant continuations of a snapshot
+across a process pool
+
+A snapshot is the gzipped pickle of the whole Solver: players, stakes, chains, mempools, in-flight messages,
+consensus stages and the state of the random generators, so a loaded solver continues bit-exactly. Only the
+tracer's sinks are left out (see Solver.__getstate__), and of the chain file only its path and length are kept.
+Forks write neither chain files nor metrics, so they cannot clobber the files of the run they continue.
+
+Usage:
+  checkpoint.py (--help | -h)
+  checkpoint.py fork [options] <snapshot> <variants>
+
+Arguments:
+  <snapshot>            snapshot written with CHECKPOINT_EVERY / --checkpointevery
+  <variants>            JSON list, or path to a JSON file, of option overrides, one continuation each, e.g.
+                        '[{"SEED": 1}, {"SEED": 2, "STAKES": {"0": 50}}, {"P_TRANSACTIONS": 0.5}]'. SEED reseeds
+                        the random generators, STAKES sets the stake of player ids, N_ROUNDS is the total number
+                        of rounds, and any other option replaces the solver's setting
+
+Options:
+  --processes=<n>       number of worker processes (default: all cores)
+  --out=<file>          write the table to file instead of stdout
+  --help                show this
+"""
+
+import chainlog
+import metrics
+import tracer
+
+from docopt import docopt
+import csv
+import gzip
+import json
+import multiprocessing
+import os
+import pickle
+import sys
+import time
+
+RESUME_OPTS = ("N_ROUNDS", "CHECKPOINT_EVERY", "CHECKPOINT_FILE") # options of a resumed run that replace the snapshot's
+
+def save(sol, path):
+    """Writes a snapshot of the solver sol to path. The file is replaced atomically, so an interrupted run
+       always leaves the previous snapshot intact"""
+
+    tmp = path + ".tmp"
+    with gzip.open(tmp, "wb", compresslevel=1) as f:
+        pickle.dump(sol, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+def load(path, opts=None):
+    """Returns the solver of the snapshot at path, ready to continue with simulate(). The tracer is created
+       from the TRACE_* options in opts, the chain file and the metrics from the CHAIN_* and METRICS_* options
+       (continuing the snapshot's), and the options in RESUME_OPTS found in opts replace the snapshot's"""
+
+    with gzip.open(path, "rb") as f:
+        sol = pickle.load(f)
+
+    opts = {} if opts is None else opts
+
+    sol.tracer   = tracer.Tracer.fromOpts(opts)
+    sol.chainlog = chainlog.ChainLog.fromOpts(opts, sol.chainlog)
+    sol.metrics  = metrics.MetricsCollector.fromOpts(opts, sol.metrics)
+    apply(sol, dict((i, opts[i]) for i in RESUME_OPTS if i in opts))
+
+    return sol
+
+def apply(sol, overrides):
+    """Applies the option overrides of a fork to the solver sol (see the <variants> argument)"""
+
+    for name, value in overrides.items():
+        if name == "SEED":
+            sol.context.reseed(value)
+            sol.txgen.reseed(value)
+        elif name == "STAKES":
+            for id, stake in value.items():
+                sol.ledger.set(int(id), stake)
+        elif name.isupper() and hasattr(sol, name):
+            setattr(sol, name, value)
+        else:
+            raise ValueError("cannot override %s of a snapshot" % name)
+
+    sol.nHeartbeats = sol.N_ROUNDS*sol.N_HEARTBEATS_IN_ROUND
+
+def forkOne(args):
+    """Continues the snapshot at path with the overrides of one variant and returns (overrides, result row)"""
+
+    import sweep
+
+    path, overrides = args
+
+    start = time.perf_counter()
+    sol   = load(path) # without opts: no tracer, chain file or metrics
+    apply(sol, overrides)
+    sol.CHECKPOINT_EVERY = 0 # forks must not overwrite each other's snapshots
+
+    try:
+        sol.simulate()
+    finally:
+        sol.tracer.close()
+
+    return overrides, sweep.summarize(sol, time.perf_counter()-start)
+
+def fork(path, variants, processes=None):
+    """Continues the snapshot at path once per overrides dict in variants, in a process pool, and yields
+       (overrides, result row) as soon as each finishes"""
+
+    with multiprocessing.Pool(processes) as pool:
+        for i in pool.imap_unordered(forkOne, [(path, i) for i in variants]):
+            yield i
+
+if __name__=="__main__":
+    args = docopt(__doc__)
+
+    spec     = args["<variants>"]
+    variants = json.load(open(spec)) if os.path.exists(spec) else json.loads(spec)
+
+    processes = int(args["--processes"]) if args["--processes"] else None
+
+    out    = open(args["--out"], "w", newline="") if args["--out"] else sys.stdout
+    writer = None
+    for overrides, row in fork(args["<snapshot>"], variants, processes):
+        row = dict([("VARIANT", json.dumps(overrides, sort_keys=True))] + list(row.items()))
+        if writer is None:
+            writer = csv.DictWriter(out, fieldnames=list(row))
+            writer.writeheader()
+        writer.writerow(row)
+        out.flush()
@@ -0,0 +1,63 @@
+"""This module defines the Consensus class, the interface of the consensus mechanisms players run, and the registry
+of mechanisms selectable with the CONSENSUS option.
+
+A mechanism subclasses Consensus and registers itself under a name with register(name, cls). Every heartbeat the
+player calls roundInit, then processBatch once with all messages due in its inbox, and broadcasts everything the
+two return. The default processBatch calls processMessage once per message; mechanisms that can do better, e.g.
+check a quorum once per batch rather than once per vote, override it.
+"""
+
+MECHANISMS = {} # map of name to Consensus subclass
+
+def register(name, cls):
+    """Makes the Consensus subclass cls selectable as CONSENSUS=name"""
+
+    MECHANISMS[name] = cls
+
+def make(name, id):
+    """Returns a new instance of the mechanism name for player id"""
+
+    import pbftconsensus # registers the reference mechanisms
+
+    if name not in MECHANISMS:
+        raise ValueError("unknown consensus %s; expected one of %s" % (name, ", ".join(MECHANISMS)))
+
+    return MECHANISMS[name](id)
+
+class Consensus:
+    def __init__(self, id):
+        """Creates the consensus state of player id; player is set by the Player right after"""
+
+        self.id     = id
+        self.player = None
+
+        self.blockchain = None # the tip of the player's chain, in the solver's block store
+
+    def setup(self):
+        """Called by the solver once all players and their stakes exist"""
+
+    def roundInit(self):
+        """Called at the start of every heartbeat; returns the new outbound (message, timestamp) pairs"""
+
+        return []
+
+    def processMessage(self, msg):
+        """Processes one inbound message and returns the outbound messages it causes"""
+
+        return []
+
+    def processBatch(self, batch):
+        """Processes batch, the list of (message, delivery time) due at this heartbeat in delivery order, and
+           returns the outbound (message, timestamp) pairs. Messages caused by a message get its timestamp"""
+
+        outbound = []
+        for msg, timestamp in batch:
+            outbound.extend((i, timestamp) for i in self.processMessage(msg))
+
+        return outbound
+
+    def prune(self, final):
+        """Discards state older than the block final, which all players agree on"""
+
+    def getBlockchain(self):
+        return self.blockchain
@@ -0,0 +1,48 @@
+"""This module defines the Context class, which holds the state that must not be shared between simulations
+running in the same process: the random number generators and the id allocators.
+"""
+
+import random
+
+import numpy as np
+
+class Context:
+    def __init__(self, seed=None):
+        """Creates a new Context whose generators are seeded with seed"""
+
+        self.seed = seed
+
+        self.random   = random.Random(seed)           # python generator (transactions, sampling)
+        self.nprandom = np.random.RandomState(seed)   # numpy generator (propagation delays)
+
+        self.ids = {} # map of kind ("player", "transaction", ...) to the next id
+
+    def newId(self, kind):
+        """Returns the next id for objects of type kind, starting at 0"""
+
+        id = self.ids.get(kind, 0)
+        self.ids[kind] = id + 1
+
+        return id
+
+    def reseed(self, seed):
+        """Reseeds the generators with seed, keeping the id allocators (e.g. to fork a simulation)"""
+
+        self.seed = seed
+
+        self.random.seed(seed)
+        self.nprandom.seed(seed)
+
+class PlayerContext(Context):
+    def __init__(self, seed, id, nPlayers):
+        """Creates the Context of player id out of nPlayers: its generators are seeded with (seed, id), and the
+           ids it allocates are id modulo nPlayers, so players can run in any order, or in other processes, and
+           still draw the same numbers and ids"""
+
+        super().__init__(None if seed is None else int(np.random.SeedSequence([seed, id]).generate_state(1)[0]))
+
+        self.id       = id
+        self.nPlayers = nPlayers
+
+    def newId(self, kind):
+        return super().newId(kind)*self.nPlayers + self.id
@@ -1,7 +1,12 @@
 """This file runs the solver for any arbitrary user-defined test case. Meant to be programmed on top of."""
 
 import block
+import checkpoint
+import economics
+import live
+import memory
 import player
+import profiler
 import solver
 import transaction
 
@@ -9,9 +14,7 @@ import math
 import random
 import statistics
 
-def drive(opts):
-    """Drive execution of the program. opts: dictionary of options.
-       Ex: opts = {"PLAYERS": [(100, 1)], # list of tuples; [(number of players, stake per player)]
+DEFAULTS = {"PLAYERS": [(100, 1)],  # list of tuples; [(number of players, stake per player)]
             "N_VALIDATORS": 5,            # number of validators in the system
             "N_PROPOSERS": 1,             # number of proposers in the system
             "N_CONNECTIONS": 8,           # number of connections per player
@@ -19,31 +22,160 @@ def drive(opts):
             "N_ROUNDS": 5,                # number of rounds of proposal/validation/commit
             "N_TRANSACTIONS": 3,          # number of transactions per block
             "P_TRANSACTIONS": 0.1,        # probability of transaction per player per heartbeat
-            "MEAN_PROP_TIME": 0.1         # mean propagation time of messages (exponential distribution)
-           }"""
+            "MEAN_PROP_TIME": 0.1,        # mean propagation time of messages (exponential distribution)
+            "SEED": 42,                   # random seed
+            "MODE": "full",               # "full" simulates every message; "economics" only models round outcomes;
+                                          # "live" runs the players as asyncio tasks in real time (see live.py)
+            "ENGINE": "event",            # message delivery engine: "heartbeat", "event", "continuous" or "bsp"
+            "SHARDS": 1,                  # bsp engine: worker processes the players are split across
+            "CONSENSUS": "pbft",          # consensus mechanism registered in consensus.py, e.g. "pbft" or "pbft-serial"
+            "TOPOLOGY": "random",         # "random", "regular", "erdos-renyi", "small-world" or "scale-free"
+            "TOPOLOGY_BETA": 0.1,         # rewiring probability of small-world networks
+            "TOPOLOGY_FILE": None,        # load the network from this .npz file, or save it there if it does not exist
+            "GOSSIP_DEDUP": True,         # drop messages a player has already seen before queueing them
+            "GOSSIP_FILTER_SIZE": 65536,  # message ids remembered per player for deduplication
+            "MEMPOOL_CAPACITY": 0,        # txs held per player, lowest fees evicted first; 0 for unbounded
+            "MEMPOOL_POLICY": "fee",      # propose the best paying txs ("fee") or random ones ("random")
+            "PRUNE_DEPTH": None,          # drop consensus state and blocks older than this many blocks below the common chain
+            "MEMORY_REPORT": False,       # print the bytes held per structure and per player at the end
+            "METRICS_FILE": None,         # base path of the per heartbeat and per block metrics tables (see metrics.py)
+            "METRICS_FORMAT": "npz",      # metrics tables as chunks of "npz" files or appended "csv" files
+            "METRICS_CHUNK": 65536,       # rows of a metrics table held in memory before they are written
+            "CHAIN_FILE": None,           # stream commits and common blocks to this file while running (see chainlog.py)
+            "CHAIN_FORMAT": "jsonl",      # chain file as "jsonl" lines or compact "bin" records
+            "PROFILE": False,             # run under cProfile and print the time spent per phase
+            "PROFILE_FILE": "simulation.prof", # cProfile stats file of PROFILE runs; read with pstats
+            "CHECKPOINT_EVERY": 0,        # write a snapshot of the whole simulation every n rounds (0: never)
+            "CHECKPOINT_FILE": "checkpoint.pkl.gz", # snapshot path; may contain {round} to keep every snapshot
+            "RESUME": None,               # continue the snapshot at this path up to N_ROUNDS rounds in total
+            "RECORD_STAKES": False,       # snapshot all stakes at the start of every round (solver.ledger.snapshots())
+            "TRACE_LEVEL": "off",         # event tracing: "off", "info", "debug" or "trace"
+            "TRACE_EVENTS": None,         # optional set of traced event names, e.g. {"commit", "send"}
+            "TRACE_RING": 0,              # if > 0, keep only the last TRACE_RING events and print them at the end
+            "TRACE_FILE": None,           # optional binary trace file; decode with tracedecode.py
+            "N_REPLICAS": 1,              # economics mode: number of independent replicas simulated together
+            "P_COMMIT": 1.0,              # economics mode: probability that a round commits a block
+            "ECON_CHUNK": 100,            # economics mode: rounds drawn at once with the same stakes (1 is exact)
+            "RECORD_STAKES_EVERY": 0,     # economics mode: snapshot stakes every n rounds (0: never)
+            "LIVE_HEARTBEAT": 0.1,        # live mode: seconds per heartbeat
+            "LIVE_TRANSPORT": "queue"     # live mode: deliver over in-process "queue"s or localhost "tcp" connections
+           }
+
+def run(opts):
+    """Runs one simulation without printing anything and returns its solver. opts: dictionary of options
+       (see DEFAULTS). All state of the simulation lives in the solver, so several runs can share a process"""
+
+    if opts.get("MODE", "full") == "economics":
+        sim = economics.EconomicsSimulator(opts)
+        sim.simulate()
+        return sim
+
+    if opts.get("MODE", "full") == "live":
+        emu = live.LiveEmulator(opts)
+        try:
+            emu.simulate()
+        finally:
+            emu.sol.tracer.close()
+        return emu
+
+    sol = makeSolver(opts)
+
+    try:
+        sol.simulate()
+    finally:
+        sol.tracer.close()
 
-    solver.Solver.N_VALIDATORS          = opts["N_VALIDATORS"]
-    solver.Solver.N_PROPOSERS           = opts["N_PROPOSERS"]
-    solver.Solver.N_CONNECTIONS         = opts["N_CONNECTIONS"]
-    solver.Solver.N_HEARTBEATS_IN_ROUND = opts["N_HEARTBEATS_IN_ROUND"]
-    solver.Solver.N_ROUNDS              = opts["N_ROUNDS"]
+    return sol
 
-    player.Player.N_TRANSACTIONS = opts["N_TRANSACTIONS"]
-    player.Player.P_TRANSACTIONS = opts["P_TRANSACTIONS"]
-    player.Player.MEAN_PROP_TIME = opts["MEAN_PROP_TIME"]
+def makeSolver(opts):
+    """Returns a new solver for opts, or the solver of the snapshot RESUME (see checkpoint.load)"""
 
-    random.seed(opts["SEED"])
+    if opts.get("RESUME"):
+        return checkpoint.load(opts["RESUME"], opts)
+
+    return solver.Solver(opts)
+
+def drive(opts):
+    """Drive execution of the program. opts: dictionary of options (see DEFAULTS)"""
+
+    if opts.get("MODE", "full") == "economics":
+        driveEconomics(opts)
+        return
+
+    if opts.get("MODE", "full") == "live":
+        driveLive(opts)
+        return
 
     print("====simulating for %s rounds, %s heartbeats per round====\n"%(opts["N_ROUNDS"], opts["N_HEARTBEATS_IN_ROUND"]))
 
-    sol = solver.Solver(opts)
+    sol  = makeSolver(opts)
+    prof = profiler.Profiler(opts.get("PROFILE_FILE")) if opts.get("PROFILE") else None
     
-    sol.simulate()
+    try:
+        if prof is not None:
+            with prof:
+                sol.simulate()
+        else:
+            sol.simulate()
+    finally:
+        ring = sol.tracer.ring()
+        if ring is not None:
+            print("====last %s events====" % len(ring.records))
+            ring.dump()
+        sol.tracer.close()
+
+    print(sol.gossip)
+    print()
 
-    for i in sol.players:
-        print(i)
-        print("\t"+str(i.blockchain).replace("\n", "\n\t"))
+    if prof is not None:
+        print(prof.report())
+        if prof.path is not None:
+            print("profile saved to %s" % prof.path)
         print()
 
+    if opts.get("MEMORY_REPORT"):
+        print(memory.formatReport(memory.report(sol), sol.N_PLAYERS))
+        print()
+
+    print(summarize(sol))
+    if sol.chainlog is not None:
+        print("chain written to %s" % sol.chainlog.path)
+
+def summarize(sol):
+    """Returns a short summary of the chains at the end of a run; the chains themselves are in CHAIN_FILE"""
+
+    height    = sol.blockchain.height if sol.blockchain is not None else -1
+    latencies = [i[1] for i in sol.finality.latencies]
+
+    return ("common chain: %s blocks, tip %s\n" % (height+1, sol.blockchain.digest.hex()[:14] if height >= 0 else None) +
+            "players on the common tip: %s of %s, %s distinct tips, %s forked heights\n"
+            % (sol.finality.count(sol.blockchain), sol.N_PLAYERS, len(sol.finality.tips()), len(sol.finality.forks())) +
+            "time to finality: mean %s heartbeats\n" % (round(statistics.mean(latencies), 2) if latencies else None) +
+            "total stake: %s" % round(sol.calcTotalStake(), 2))
+
+def driveEconomics(opts):
+    """Drive execution of the economics-only mode and print a summary of the stake distribution"""
+
+    print("====simulating economics for %s rounds, %s replicas====\n"%(opts["N_ROUNDS"], opts.get("N_REPLICAS", 1)))
+
+    sim = run(opts)
+
+    percent = sim.calcPercentStake()
+    print("committed blocks per replica: mean %s" % statistics.mean(sim.committed.tolist()))
+    print("total stake per replica:      mean %s" % statistics.mean(sim.calcTotalStake().tolist()))
+    print("largest stake share:          mean %s, max %s" % (percent.max(axis=1).mean(), percent.max()))
+    print("mean stake share per player:")
+    print(percent.mean(axis=0))
+
+def driveLive(opts):
+    """Drive execution of the live mode and print the measured throughput and latencies"""
+
+    print("====running live for %s rounds, %s s per heartbeat====\n"%(opts["N_ROUNDS"], opts.get("LIVE_HEARTBEAT", 0.1)))
+
+    emu = run(opts)
 
-    print(sol.blockchain)
+    print(emu.sol.gossip)
+    print()
+    print(emu.report())
+    print()
+    print(summarize(emu.sol))
@@ -0,0 +1,111 @@
+"""This module defines the EconomicsSimulator class, which simulates only the economics of a proof of stake system.
+
+Instead of exchanging TRANSACTION/PRE_VOTE/VOTE messages, the outcome of every round is modeled directly, with
+the same semantics as the message-level Solver:
+  - the proposer of the block and N_VALIDATORS validators are drawn by stake, the validators without
+    replacement (Solver.chooseProposers, Solver.chooseValidators),
+  - the round commits a block with probability P_COMMIT,
+  - a committed block holds N_TRANSACTIONS transactions with fees max(N(MEAN_TX_FEE, STD_TX_FEE), 0), and pays
+    1 token plus an equal share of its fees to the proposer and every validator (Solver.payout).
+
+Rounds are simulated for N_REPLICAS independent replicas at once. Stake-weighted sampling without replacement
+uses exponential races (the k players with the smallest Exp(1)/stake are a successive stake-weighted sample).
+Rounds are drawn in chunks of ECON_CHUNK rounds that share the stakes at the start of the chunk; ECON_CHUNK = 1
+is exact, larger chunks are much faster and lag the selection weights by less than one chunk.
+"""
+
+import player
+
+import numpy as np
+
+class EconomicsSimulator:
+    MAX_CHUNK_ELEMENTS = 4000000 # bound on rounds*replicas*players drawn at once
+
+    def __init__(self, opts):
+        """Initiates the simulator with the players, number of rounds and number of replicas in opts"""
+
+        self.N_VALIDATORS   = opts["N_VALIDATORS"]
+        self.N_ROUNDS       = opts["N_ROUNDS"]
+        self.N_TRANSACTIONS = opts["N_TRANSACTIONS"]
+        self.N_REPLICAS     = opts.get("N_REPLICAS", 1)
+        self.P_COMMIT       = opts.get("P_COMMIT", 1.0)
+        self.ECON_CHUNK     = opts.get("ECON_CHUNK", 100)
+
+        self.rng = np.random.default_rng(opts.get("SEED"))
+
+        initial = []
+        for nPlayers, stake in opts["PLAYERS"]:
+            initial.extend([stake]*nPlayers)
+        self.N_PLAYERS = len(initial)
+
+        self.stakes    = np.tile(np.array(initial, dtype=float), (self.N_REPLICAS, 1)) # (replicas, players)
+        self.committed = np.zeros(self.N_REPLICAS, dtype=np.int64)                     # committed blocks
+        self.fees      = np.zeros(self.N_REPLICAS)                                      # total fees paid out
+        self.round     = 0
+
+        self.recordEvery = opts.get("RECORD_STAKES_EVERY", 0) # snapshot stakes every n rounds
+        self.history     = []
+
+    def simulate(self):
+        """Simulate all rounds"""
+
+        chunk = max(1, min(self.ECON_CHUNK, self.MAX_CHUNK_ELEMENTS // (self.N_REPLICAS*self.N_PLAYERS)))
+        if self.recordEvery:
+            chunk = min(chunk, self.recordEvery)
+
+        while self.round < self.N_ROUNDS:
+            c = min(chunk, self.N_ROUNDS - self.round)
+            if self.recordEvery:
+                c = min(c, self.recordEvery - self.round % self.recordEvery)
+
+            self.simulateRounds(c)
+
+            if self.recordEvery and self.round % self.recordEvery == 0:
+                self.history.append(self.stakes.copy())
+
+    def simulateRounds(self, c):
+        """Simulates c rounds for all replicas with the current stakes as selection weights"""
+
+        R, n, k = self.N_REPLICAS, self.N_PLAYERS, self.N_VALIDATORS
+        rng     = self.rng
+
+        if (self.stakes > 0).sum(axis=1).min() < max(k, 1): # as StakeSampler.sampleWithout
+            raise ValueError("cannot draw %s distinct players with positive stake" % max(k, 1))
+
+        with np.errstate(divide="ignore"):
+            invStakes = 1/self.stakes # players without stake get infinite keys and are never drawn
+
+        # validators: the k smallest keys of an exponential race, proposer: the smallest key of an independent one
+        valKeys    = rng.standard_exponential((c, R, n)) * invStakes
+        validators = np.argpartition(valKeys, k-1, axis=2)[:, :, :k] if k else np.empty((c, R, 0), dtype=np.intp)
+        proposers  = np.argmin(rng.standard_exponential((c, R, n)) * invStakes, axis=2)
+
+        commit = rng.random((c, R)) < self.P_COMMIT
+        fees   = np.maximum(rng.normal(player.Player.MEAN_TX_FEE, player.Player.STD_TX_FEE, (c, R, self.N_TRANSACTIONS)), 0).sum(axis=2)
+        fees  *= commit
+
+        # reward 1 token plus an equal share of the fees (Solver.payout)
+        winners = np.concatenate([validators, proposers[:, :, None]], axis=2) # (c, R, k+1)
+        amounts = np.where(commit, 1 + fees/(k+1), 0.0)                       # (c, R)
+
+        flat = (np.arange(R)[None, :, None]*n + winners).ravel()
+        self.stakes += np.bincount(flat, weights=np.repeat(amounts.ravel(), k+1), minlength=R*n).reshape(R, n)
+
+        self.committed += commit.sum(axis=0)
+        self.fees      += fees.sum(axis=0)
+        self.round     += c
+
+    def calcPercentStake(self):
+        """Calculates the percent stake of every player, one row per replica"""
+
+        return self.stakes/self.stakes.sum(axis=1, keepdims=True)
+
+    def calcTotalStake(self):
+        """Calculates the total stake of every replica"""
+
+        return self.stakes.sum(axis=1)
+
+    def snapshots(self):
+        """Returns the recorded snapshots as a (snapshots, replicas, players) array"""
+
+        return np.array(self.history).reshape(len(self.history), self.N_REPLICAS, self.N_PLAYERS)
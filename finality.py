@@ -0,0 +1,100 @@
+"""This module defines the FinalityTracker class, an index of the players on every chain tip.
+
+The tracker is updated only when a player's tip changes (see Player.blockchain), so whether all players agree is
+an O(1) lookup instead of a comparison of every player's chain. It also records the heartbeat every block first
+became a tip, which gives the time to finality of the blocks that become common, and can list forks: heights
+that two or more tips compete for.
+"""
+
+class FinalityTracker:
+    def __init__(self, players):
+        """Creates a FinalityTracker over players, indexed by their current tips"""
+
+        self.members = {} # map of tip digest (None for the empty chain) to the set of ids of the players on it
+        self.blocks  = {} # map of tip digest to the tip block
+
+        self.firstTip  = {} # map of digest to (height, heartbeat it first became a tip) of blocks not final yet
+        self.latencies = [] # (height, heartbeats from first tip to final) of every block that became final
+
+        for i in players:
+            self.add(i.id, i.blockchain)
+
+    def add(self, id, tip, heartbeat=None):
+        digest = tip.digest if tip is not None else None
+
+        members = self.members.get(digest)
+        if members is None:
+            members = self.members[digest] = set()
+            self.blocks[digest] = tip
+            if digest is not None and heartbeat is not None:
+                self.firstTip.setdefault(digest, (tip.height, heartbeat))
+        members.add(id)
+
+    def move(self, id, old, new, heartbeat):
+        """Moves player id from the tip old to the tip new at heartbeat"""
+
+        digest  = old.digest if old is not None else None
+        members = self.members[digest]
+        members.discard(id)
+        if not members:
+            del self.members[digest]
+            del self.blocks[digest]
+
+        self.add(id, new, heartbeat)
+
+    def agreed(self):
+        """Returns the tip all players are on, or None if they disagree or all chains are empty"""
+
+        if len(self.members) != 1:
+            return None
+        return next(iter(self.blocks.values()))
+
+    def count(self, tip):
+        """Returns the number of players on tip"""
+
+        return len(self.members.get(tip.digest if tip is not None else None, ()))
+
+    def stake(self, tip, ledger):
+        """Returns the total stake, in ledger, of the players on tip"""
+
+        members = self.members.get(tip.digest if tip is not None else None)
+        return float(ledger.stakes[list(members)].sum()) if members else 0.0
+
+    def tips(self):
+        """Returns the current tips, the empty chain as None"""
+
+        return list(self.blocks.values())
+
+    def forks(self):
+        """Returns a map of height to the tips competing for it, for every height with more than one tip"""
+
+        heights = {}
+        for tip in self.blocks.values():
+            if tip is not None:
+                heights.setdefault(tip.height, []).append(tip)
+
+        return dict((h, tips) for h, tips in heights.items() if len(tips) > 1)
+
+    def firstTipAt(self, nBlock):
+        """Returns the heartbeat nBlock, which is not final yet, first became a tip, or None if it never did"""
+
+        first = self.firstTip.get(nBlock.digest)
+        return first[1] if first is not None else None
+
+    def oldestTipAt(self):
+        """Returns the earliest heartbeat a block that is not final yet first became a tip, or None"""
+
+        return min((i[1] for i in self.firstTip.values()), default=None)
+
+    def final(self, blocks, heartbeat):
+        """Records that blocks, oldest first, became final at heartbeat, and forgets blocks they outdate"""
+
+        height = -1
+        for i in blocks:
+            first = self.firstTip.pop(i.digest, None)
+            if first is not None:
+                self.latencies.append((i.height, heartbeat - first[1]))
+            height = i.height
+
+        # blocks at or below a final height lost a fork and can never become final
+        self.firstTip = dict(i for i in self.firstTip.items() if i[1][0] > height)
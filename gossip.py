@@ -0,0 +1,60 @@
+"""This module defines the SeenFilter class, a bounded filter of recently seen message keys, and the GossipStats
+class, which counts how much redundant traffic the gossip protocol generates.
+
+Every player has a SeenFilter keyed on Message.id (a forwarded message is the same Message object, so it keeps
+its id). Player.deliver checks the recipient's filter before queueing a message in its inbox, so duplicates are
+dropped before they are queued instead of after delivery; Player.sendOutbound only marks the sender's own
+messages as seen, so their echoes are dropped. Copies are not queued in order of arrival, so a copy that arrives
+earlier than the one already queued is queued as well and supersedes it (Player.claim): the recipient always
+processes the earliest copy.
+"""
+
+class SeenFilter:
+    def __init__(self, capacity):
+        """Creates a SeenFilter that remembers at least the last capacity keys and at most 2*capacity keys"""
+
+        self.capacity = capacity
+        self.current  = set() # keys seen in the current generation
+        self.previous = set() # keys seen in the previous generation
+
+    def add(self, key):
+        """Adds key to the filter; returns False if it was already there"""
+
+        if key in self.current or key in self.previous:
+            return False
+
+        self.current.add(key)
+        if len(self.current) >= self.capacity: # rotate generations, forgetting the oldest keys
+            self.previous = self.current
+            self.current  = set()
+
+        return True
+
+    def __contains__(self, key):
+        return key in self.current or key in self.previous
+
+    def __len__(self):
+        return len(self.current) + len(self.previous)
+
+class GossipStats:
+    def __init__(self):
+        """Creates zeroed gossip counters"""
+
+        self.unique    = 0 # distinct messages broadcast
+        self.sent      = 0 # messages sent over an edge, duplicates included
+        self.redundant = 0 # messages sent to a player that had already seen them
+        self.dropped   = 0 # redundant messages dropped before being queued
+
+    def delivered(self):
+        """Returns the number of messages that were queued for delivery"""
+
+        return self.sent - self.dropped
+
+    def amplification(self):
+        """Returns the number of deliveries per distinct message"""
+
+        return self.delivered()/self.unique if self.unique else 0.0
+
+    def __str__(self):
+        return "gossip: %s unique messages, %s sent, %s redundant, %s dropped, amplification %.2f" % (
+            self.unique, self.sent, self.redundant, self.dropped, self.amplification())
@@ -0,0 +1,66 @@
+"""This module defines the StakeLedger class, which holds the stake of every player in one numpy array.
+
+Player.stake is a property over this array. Payouts are applied as one vectorized scatter-add, the total stake
+is maintained incrementally, and per-round snapshots are copied into a preallocated 2-D array.
+"""
+
+import numpy as np
+
+class StakeLedger:
+    def __init__(self, stakes, sampler=None):
+        """Creates a StakeLedger from a list of stakes indexed by player id. If sampler (a StakeSampler) is given,
+           it is kept in sync with every change"""
+
+        self.stakes  = np.array(stakes, dtype=float)
+        self.total   = float(self.stakes.sum())
+        self.sampler = sampler
+
+        self.history    = None # snapshots of stakes, one row per snapshot
+        self.nSnapshots = 0
+
+    def add(self, ids, amounts):
+        """Adds amounts (an array or a scalar) to the stakes of players ids; ids may repeat"""
+
+        ids     = np.asarray(ids, dtype=np.intp)
+        amounts = np.broadcast_to(np.asarray(amounts, dtype=float), ids.shape)
+
+        np.add.at(self.stakes, ids, amounts)
+        self.total += float(amounts.sum())
+
+        if self.sampler is not None:
+            for i, amount in zip(ids.tolist(), amounts.tolist()):
+                self.sampler.update(i, amount)
+
+    def set(self, i, stake):
+        """Sets the stake of player i"""
+
+        self.add([i], stake - self.stakes[i])
+
+    def percent(self):
+        """Returns the array of stakes as a fraction of the total stake"""
+
+        return self.stakes/self.total
+
+    def reserve(self, nSnapshots):
+        """Preallocates room for nSnapshots snapshots"""
+
+        self.history = np.empty((nSnapshots, len(self.stakes)))
+
+    def snapshot(self):
+        """Records the current stakes as the next row of history, growing it if it is full"""
+
+        if self.history is None:
+            self.reserve(16)
+        if self.nSnapshots == len(self.history):
+            self.history = np.concatenate([self.history, np.empty_like(self.history)])
+
+        self.history[self.nSnapshots] = self.stakes
+        self.nSnapshots += 1
+
+    def snapshots(self):
+        """Returns the recorded snapshots as a (snapshots, players) array"""
+
+        if self.history is None:
+            return np.empty((0, len(self.stakes)))
+
+        return self.history[:self.nSnapshots]
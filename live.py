@@ -0,0 +1,239 @@
+"""This module defines the LiveEmulator class, which runs MODE "live": every player is an asyncio task driven by
+real event loop time instead of simulated heartbeats.
+
+A clock task starts heartbeat h at LIVE_HEARTBEAT*h seconds and wakes every player with a tick. A player task
+waits on its queue; each time it wakes, it runs roundInit if it was ticked, hands every message that arrived in
+the meantime to its consensus as one batch, and broadcasts the results. The usual Player.sendOutbound draws
+the propagation delays (in heartbeats, from MEAN_PROP_TIME); a LiveInbox turns them into real delays, after
+which the message is put on the recipient's queue, either directly (LIVE_TRANSPORT "queue") or over a
+localhost TCP connection to the recipient (LIVE_TRANSPORT "tcp"), which adds pickling and socket I/O.
+
+Everything runs on one event loop, so the results show how many nodes one core can host: the report gives the
+throughput of the common chain, the latency of every delivery from send to processing, its lateness past the
+drawn delay, and how late the heartbeats started.
+"""
+
+import solver
+
+import array
+import asyncio
+import functools
+import pickle
+import struct
+import time
+
+import numpy as np
+
+TRANSPORTS = ("queue", "tcp")
+
+TICK = None # queue item that starts a heartbeat
+
+FRAME = struct.Struct("<I") # length prefix of a pickled delivery on tcp connections
+
+class LiveInbox:
+    """Inbox of a player in live mode; messages pushed into it arrive in its queue after their delay"""
+
+    def __init__(self, emulator, player):
+        self.emulator = emulator
+        self.player   = player
+        self.queue    = asyncio.Queue() # TICK, or (message, arrival time in heartbeats, time sent, time due) with
+                                        # the last two in event loop seconds
+
+    def pushMany(self, msgs, timestamps):
+        em    = self.emulator
+        now   = em.loop.time()
+        clock = em.clock()
+        send  = em.transport.send
+
+        for msg, timestamp in zip(msgs, timestamps):
+            delay = max(timestamp - clock, 0)*em.HEARTBEAT
+            em.loop.call_later(delay, send, self.player.id, msg, timestamp, now, now+delay)
+
+    def popDue(self, heartbeat):
+        """Deliveries are driven by the event loop, so there is never anything to pop here"""
+
+        return ()
+
+    def __len__(self):
+        return self.queue.qsize()
+
+class QueueTransport:
+    """Puts deliveries straight into the recipient's queue"""
+
+    def __init__(self, emulator):
+        self.players = emulator.sol.players
+
+    async def start(self):
+        pass
+
+    def send(self, dst, msg, timestamp, sent, due):
+        self.players[dst].inbound.queue.put_nowait((msg, timestamp, sent, due))
+
+    async def close(self):
+        pass
+
+class TcpTransport:
+    """Sends deliveries as length-prefixed pickles over one localhost TCP connection per recipient"""
+
+    def __init__(self, emulator):
+        self.players  = emulator.sol.players
+        self.servers  = []
+        self.writers  = []
+        self.handlers = [] # tasks reading the connections, which end once the writers are closed
+
+    async def start(self):
+        for i in self.players:
+            server = await asyncio.start_server(functools.partial(self.receive, i), "127.0.0.1", 0)
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.sockets[0].getsockname()[1])
+            self.servers.append(server)
+            self.writers.append(writer)
+
+    def send(self, dst, msg, timestamp, sent, due):
+        data = pickle.dumps((msg, timestamp, sent, due), pickle.HIGHEST_PROTOCOL)
+        self.writers[dst].write(FRAME.pack(len(data)) + data)
+
+    async def receive(self, player, reader, writer):
+        self.handlers.append(asyncio.current_task())
+
+        queue = player.inbound.queue
+        try:
+            while True:
+                size = FRAME.unpack(await reader.readexactly(FRAME.size))[0]
+                queue.put_nowait(pickle.loads(await reader.readexactly(size)))
+        except asyncio.IncompleteReadError: # connection closed
+            writer.close()
+
+    async def close(self):
+        for i in self.writers:
+            i.close()
+        await asyncio.gather(*self.handlers)
+        for i in self.servers:
+            i.close()
+            await i.wait_closed()
+
+class LiveEmulator:
+    def __init__(self, opts):
+        """Creates a LiveEmulator for opts (see driver.DEFAULTS)"""
+
+        self.HEARTBEAT = opts.get("LIVE_HEARTBEAT", 0.1)       # seconds per heartbeat
+        self.TRANSPORT = opts.get("LIVE_TRANSPORT", "queue")   # "queue" or "tcp"
+        if self.TRANSPORT not in TRANSPORTS:
+            raise ValueError("unknown transport %s; expected one of %s" % (self.TRANSPORT, ", ".join(TRANSPORTS)))
+
+        self.sol = solver.Solver(dict(opts, ENGINE="event"))
+        for i in self.sol.players:
+            i.inbound = LiveInbox(self, i)
+
+        self.transport = (QueueTransport if self.TRANSPORT == "queue" else TcpTransport)(self)
+
+        self.loop    = None # the running event loop
+        self.start   = 0.0  # event loop time of heartbeat 0
+        self.seconds = 0.0  # wall-clock length of the run
+
+        self.latencies = array.array("d") # seconds from send to processing, per delivery
+        self.lateness  = array.array("d") # seconds from the end of the drawn delay to processing, per delivery
+        self.lags      = array.array("d") # seconds every heartbeat started late
+
+    def clock(self):
+        """Returns the current time in heartbeats"""
+
+        return (self.loop.time() - self.start)/self.HEARTBEAT
+
+    def simulate(self):
+        """Runs the players in real time for N_ROUNDS rounds"""
+
+        start = time.perf_counter()
+        asyncio.run(self.main())
+        self.seconds = time.perf_counter() - start
+
+        self.sol.finish()
+
+    async def main(self):
+        self.loop = asyncio.get_running_loop()
+        await self.transport.start()
+
+        self.start = self.loop.time()
+        tasks = [asyncio.create_task(self.runPlayer(i)) for i in self.sol.players]
+        try:
+            await self.runClock(tasks)
+        finally:
+            for i in tasks:
+                i.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self.transport.close()
+
+    async def runClock(self, tasks):
+        """Starts every heartbeat on time, or as soon as the event loop gets to it"""
+
+        sol = self.sol
+        for h in range(sol.nHeartbeats+1):
+            await asyncio.sleep(max(self.start + h*self.HEARTBEAT - self.loop.time(), 0))
+            self.lags.append(self.loop.time() - self.start - h*self.HEARTBEAT)
+
+            for i in tasks: # a failed player ends the run
+                if i.done():
+                    i.result()
+
+            if h > 0:
+                sol.endHeartbeat()
+            if h == sol.nHeartbeats:
+                return
+
+            sol.beginHeartbeat(h)
+            for i in sol.players:
+                i.inbound.queue.put_nowait(TICK)
+
+    async def runPlayer(self, player):
+        """Processes everything that arrives for player, one batch per wakeup"""
+
+        queue     = player.inbound.queue
+        consensus = player.consensus
+
+        while True:
+            items = [await queue.get()]
+            while not queue.empty():
+                items.append(queue.get_nowait())
+
+            now   = self.loop.time()
+            clock = self.clock()
+
+            if TICK in items:
+                player.outbound += consensus.roundInit()
+
+            batch = []
+            for i in items:
+                if i is TICK:
+                    continue
+                msg, timestamp, sent, due = i
+                if not player.claim(msg, timestamp): # superseded by an earlier copy
+                    continue
+                self.latencies.append(now - sent)
+                self.lateness.append(now - due)
+                batch.append((msg, clock))
+
+            if batch:
+                player.receive(batch)
+
+            player.blockchain = consensus.getBlockchain()
+            player.sendOutbound()
+
+    def report(self):
+        """Returns the measured throughput, latencies and heartbeat lags as lines of text"""
+
+        sol    = self.sol
+        blocks = list(sol.blockchain.chain()) if sol.blockchain is not None else []
+        txs    = sum(len(i.txs) for i in blocks)
+
+        def percentiles(values):
+            if not values:
+                return "none"
+            p = np.percentile(np.frombuffer(values, dtype=np.float64)*1000, [50, 90, 99])
+            return "p50 %.2f ms, p90 %.2f ms, p99 %.2f ms" % tuple(p)
+
+        lags = np.frombuffer(self.lags, dtype=np.float64)*1000
+        return "\n".join(["%s players over %s for %.2f s" % (sol.N_PLAYERS, self.TRANSPORT, self.seconds),
+                          "throughput: %.2f blocks/s, %.2f transactions/s" % (len(blocks)/self.seconds, txs/self.seconds),
+                          "deliveries: %s, %.0f/s" % (len(self.latencies), len(self.latencies)/self.seconds),
+                          "latency:  " + percentiles(self.latencies),
+                          "lateness: " + percentiles(self.lateness),
+                          "heartbeat lag: mean %.2f ms, max %.2f ms" % (lags.mean(), lags.max())])
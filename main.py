@@ -15,6 +15,37 @@ Options:
   --ptransactions=<ptrans>        probability of transaction per player per heartbeat [default: 0.1]
   --meanproptime=<meanproptime>   mean propagation time of messages [default: 0.1]
   --seed=<seed>                   random seed [default: 42]
+  --mode=<mode>                   "full" simulates every message, "economics" only models round outcomes, "live" runs
+                                  the players as asyncio tasks in real time [default: full]
+  --replicas=<n>                  economics mode: number of independent replicas [default: 1]
+  --pcommit=<p>                   economics mode: probability that a round commits a block [default: 1.0]
+  --econchunk=<n>                 economics mode: rounds drawn at once with the same stakes (1 is exact) [default: 100]
+  --liveheartbeat=<s>             live mode: seconds per heartbeat [default: 0.1]
+  --transport=<transport>         live mode: deliver over in-process queue or localhost tcp [default: queue]
+  --topology=<topology>           network: random, regular, erdos-renyi, small-world or scale-free [default: random]
+  --topologyfile=<file>           load the network from this file, or save the generated network there
+  --engine=<engine>               message delivery engine: heartbeat, event, continuous or bsp [default: event]
+  --shards=<n>                    bsp engine: number of worker processes the players are split across [default: 1]
+  --consensus=<name>              consensus mechanism, e.g. pbft or pbft-serial (see consensus.py) [default: pbft]
+  --nodedup                       deliver messages to players that have already seen them
+  --gossipfilter=<n>              message ids remembered per player for deduplication [default: 65536]
+  --mempoolcapacity=<n>           txs held per player, lowest fees evicted first; 0 for unbounded [default: 0]
+  --mempoolpolicy=<policy>        propose the best paying txs (fee) or random ones (random) [default: fee]
+  --prunedepth=<n>                drop state older than n blocks below the common chain, once all players agree
+  --memory                        print the memory held per structure and per player
+  --metrics=<base>                write per heartbeat and per block metrics tables next to this base path
+  --metricsformat=<format>        metrics tables as npz chunks or csv [default: npz]
+  --chainfile=<file>              stream commits and common blocks to this file while running
+  --chainformat=<format>          chain file as jsonl lines or compact bin records [default: jsonl]
+  --profile                       run under cProfile, save its stats and print the time spent per phase
+  --profilefile=<file>            cProfile stats file [default: simulation.prof]
+  --checkpointevery=<n>           write a snapshot of the whole simulation every n rounds, 0 for never [default: 0]
+  --checkpointfile=<file>         snapshot path; may contain {round} to keep every snapshot [default: checkpoint.pkl.gz]
+  --resume=<file>                 continue the simulation of a snapshot up to --nrounds rounds in total
+  --trace=<level>                 event tracing level: off, info, debug or trace [default: off]
+  --traceevents=<events>          comma-separated event types to trace, e.g. "commit,send" (default: all)
+  --tracering=<n>                 keep only the last n traced events and print them at the end [default: 0]
+  --tracefile=<file>              write traced events to a binary trace file (see tracedecode.py)
   --help                          show this
 """
 
@@ -38,7 +69,37 @@ if __name__=="__main__":
             "N_TRANSACTIONS":        int(args["--ntransactions"]),       
             "P_TRANSACTIONS":      float(args["--ptransactions"]),      
             "MEAN_PROP_TIME":      float(args["--meanproptime"]),
-            "SEED":                  int(args["--seed"])
+            "SEED":                  int(args["--seed"]),
+            "MODE":                      args["--mode"],
+            "N_REPLICAS":            int(args["--replicas"]),
+            "P_COMMIT":            float(args["--pcommit"]),
+            "ECON_CHUNK":            int(args["--econchunk"]),
+            "LIVE_HEARTBEAT":      float(args["--liveheartbeat"]),
+            "LIVE_TRANSPORT":            args["--transport"],
+            "ENGINE":                    args["--engine"],
+            "SHARDS":                int(args["--shards"]),
+            "CONSENSUS":                 args["--consensus"],
+            "TOPOLOGY":                  args["--topology"],
+            "TOPOLOGY_FILE":             args["--topologyfile"],
+            "GOSSIP_DEDUP":          not args["--nodedup"],
+            "PRUNE_DEPTH":           int(args["--prunedepth"]) if args["--prunedepth"] is not None else None,
+            "MEMORY_REPORT":         args["--memory"],
+            "METRICS_FILE":          args["--metrics"],
+            "METRICS_FORMAT":        args["--metricsformat"],
+            "CHAIN_FILE":                args["--chainfile"],
+            "CHAIN_FORMAT":              args["--chainformat"],
+            "PROFILE":               args["--profile"],
+            "PROFILE_FILE":          args["--profilefile"],
+            "CHECKPOINT_EVERY":      int(args["--checkpointevery"]),
+            "CHECKPOINT_FILE":       args["--checkpointfile"],
+            "RESUME":                args["--resume"],
+            "GOSSIP_FILTER_SIZE":    int(args["--gossipfilter"]),
+            "MEMPOOL_CAPACITY":      int(args["--mempoolcapacity"]),
+            "MEMPOOL_POLICY":        args["--mempoolpolicy"],
+            "TRACE_LEVEL":               args["--trace"],
+            "TRACE_EVENTS":              args["--traceevents"],
+            "TRACE_RING":            int(args["--tracering"]),
+            "TRACE_FILE":                args["--tracefile"]
            }
 
     driver.drive(opts)
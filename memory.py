@@ -0,0 +1,78 @@
+"""This module accounts for the memory held by a simulation, per structure and per player.
+
+Sizes are deep: a structure is charged for its containers and for the blocks, transactions and messages they
+hold. Objects shared between structures are charged once, to the first structure that reaches them; the shared
+block store is visited first, so blocks and the transactions in them count there.
+"""
+
+import block
+import gossip
+import mempool
+import message
+import scheduler
+import transaction
+
+import sys
+
+# objects whose attributes are part of their size; any other object is counted shallowly
+TRAVERSED = (block.Block, transaction.Transaction, mempool.Mempool, gossip.SeenFilter,
+             scheduler.ListInbox, scheduler.HeapInbox)
+
+# per player structures: name and the objects that make them up
+PER_PLAYER = [("chain tip",       lambda p: [p.blockchain]),
+              ("inbox",           lambda p: [p.inbound] if not isinstance(p.inbound, scheduler.QueueInbox) else []),
+              ("outbound",        lambda p: [p.outbound]),
+              ("seen messages",   lambda p: [p.seen, p.pending]),
+              ("mempool",         lambda p: [p.consensus.mempool]),
+              ("seenTxs",         lambda p: [p.consensus.seenTxs]),
+              ("seenBlocks",      lambda p: [p.consensus.seenBlocks, p.consensus.seenProposals]),
+              ("committedBlocks", lambda p: [p.consensus.committedBlocks]),
+              ("votes",           lambda p: [p.consensus.preVotes.voters, p.consensus.preVotes.stakes,
+                                             p.consensus.votes.voters, p.consensus.votes.stakes])]
+
+def deepSize(obj, seen):
+    """Returns the size in bytes of obj and everything it holds that is not in seen (a set of object ids),
+       and adds all of it to seen"""
+
+    size  = 0
+    stack = [obj]
+    while stack:
+        i = stack.pop()
+        if id(i) in seen:
+            continue
+        seen.add(id(i))
+        size += sys.getsizeof(i)
+
+        if isinstance(i, dict):
+            stack.extend(i.keys())
+            stack.extend(i.values())
+        elif isinstance(i, (list, tuple, set, frozenset)):
+            stack.extend(i)
+        elif isinstance(i, message.Message):
+            stack.extend(getattr(i, j) for j in message.Message.__slots__)
+        elif isinstance(i, TRAVERSED):
+            stack.extend(vars(i).values())
+
+    return size
+
+def report(sol):
+    """Returns a list of (structure, bytes) for the shared and per player state of the solver sol"""
+
+    seen = set()
+    rows = [("blockStore", deepSize(sol.blockStore.blocks, seen))]
+    if sol.events is not None:
+        rows.append(("event queue", deepSize(sol.events.heap, seen)))
+
+    for name, parts in PER_PLAYER:
+        rows.append((name, sum(deepSize(j, seen) for i in sol.players for j in parts(i))))
+
+    return rows
+
+def formatReport(rows, nPlayers):
+    """Formats the rows of report() as a table with the total and per player bytes of every structure"""
+
+    lines = ["%-16s %14s %14s" % ("structure", "bytes", "per player")]
+    for name, size in rows + [("total", sum(i[1] for i in rows))]:
+        lines.append("%-16s %14d %14.1f" % (name, size, size/nPlayers))
+
+    return "\n".join(lines)
@@ -0,0 +1,113 @@
+"""This module defines the Mempool class, a player's pool of pending transactions.
+
+A dict keyed on transaction id indexes the pool. Under the "fee" policy, a max-heap on fee selects the k best
+paying transactions in O(k log n); under the "random" policy, a dense list selects k uniformly random ones in
+O(k). With a capacity, a min-heap on fee evicts the lowest paying transaction when the pool is full.
+
+Removal is lazy: remove() only drops the index entry, and stale heap entries are skipped when they surface or
+compacted away once they outnumber the live ones.
+"""
+
+import heapq
+
+class Mempool:
+    POLICIES = ("fee", "random")
+
+    def __init__(self, capacity=0, policy="fee"):
+        """Creates an empty Mempool holding at most capacity transactions (0 for unbounded)"""
+
+        if policy not in Mempool.POLICIES:
+            raise ValueError("unknown mempool policy %s; expected one of %s" % (policy, ", ".join(Mempool.POLICIES)))
+
+        self.capacity = capacity
+        self.policy   = policy
+
+        self.seqs    = {} # map of tx id to the sequence number of its live heap entries
+        self.byFee   = [] # max-heap of (-fee, seq, tx), "fee" policy only
+        self.lowest  = [] # min-heap of (fee, seq, tx), with a capacity only
+        self.txs     = [] # dense list of txs, "random" policy only
+        self.pos     = {} # map of tx id to index in txs, "random" policy only
+        self.seq     = 0
+        self.evicted = 0  # number of txs evicted because the pool was full
+
+    def add(self, tx):
+        """Adds tx to the pool; returns False if it was already there or was evicted right away"""
+
+        if tx.id in self.seqs:
+            return False
+
+        self.seq += 1
+        self.seqs[tx.id] = self.seq
+        if self.policy == "fee":
+            heapq.heappush(self.byFee, (-tx.fee, self.seq, tx))
+        else:
+            self.pos[tx.id] = len(self.txs)
+            self.txs.append(tx)
+
+        if self.capacity:
+            heapq.heappush(self.lowest, (tx.fee, self.seq, tx))
+            if len(self.seqs) > self.capacity:
+                evicted = self.popLowest()
+                self.evicted += 1
+                return evicted is not tx
+
+        return True
+
+    def remove(self, tx):
+        """Removes tx from the pool if it is there"""
+
+        if self.seqs.pop(tx.id, None) is None:
+            return
+
+        if self.policy == "random":
+            i    = self.pos.pop(tx.id)
+            last = self.txs.pop()
+            if last is not tx:
+                self.txs[i] = last
+                self.pos[last.id] = i
+
+        self.compact()
+
+    def select(self, k, rng):
+        """Returns up to k txs without removing them: the best paying first under the "fee" policy, or a uniform
+           sample drawn with rng (a random.Random) under the "random" policy"""
+
+        k = min(k, len(self.seqs))
+        if self.policy == "random":
+            return rng.sample(self.txs, k)
+
+        chosen = []
+        while len(chosen) < k:
+            entry = heapq.heappop(self.byFee)
+            if self.seqs.get(entry[2].id) == entry[1]: # stale entries are dropped for good
+                chosen.append(entry)
+        for entry in chosen:
+            heapq.heappush(self.byFee, entry)
+
+        return [entry[2] for entry in chosen]
+
+    def popLowest(self):
+        """Removes and returns the lowest paying tx"""
+
+        while True:
+            fee, seq, tx = heapq.heappop(self.lowest)
+            if self.seqs.get(tx.id) == seq:
+                self.remove(tx)
+                return tx
+
+    def compact(self):
+        """Rebuilds the heaps once stale entries outnumber the live ones"""
+
+        n = len(self.seqs)
+        if len(self.byFee) > 2*n + 64:
+            self.byFee = [i for i in self.byFee if self.seqs.get(i[2].id) == i[1]]
+            heapq.heapify(self.byFee)
+        if len(self.lowest) > 2*n + 64:
+            self.lowest = [i for i in self.lowest if self.seqs.get(i[2].id) == i[1]]
+            heapq.heapify(self.lowest)
+
+    def __contains__(self, tx):
+        return tx.id in self.seqs
+
+    def __len__(self):
+        return len(self.seqs)
@@ -1,27 +1,29 @@
 """This module defines the Message class, which represents a message sent between nodes.
+
+Messages have fixed fields and no __dict__, and hold handles rather than objects where they can: a BLOCK
+message carries the digest of the block, which receivers look up in the solver's block store. One message is
+shared by all recipients and forwards of it, so millions of in-flight deliveries cost one inbox entry each.
 """
 
 class Message:
-    id = 0
+    __slots__ = ("type", "value", "senderId", "id")
 
     class MessageType:
         TRANSACTION  = 0
         PRE_VOTE     = 1
         VOTE         = 2
         BLOCK        = 3
-        
-    def __init__(self, type, value, senderId):
-        self.id = Message.id
-        Message.id += 1
 
-        self.type = type
-        self.value = value
-        
+    def __init__(self, type, value, senderId, id):
+        """Creates a new Message of type from player senderId. value: the transaction, block digest or voted
+           block digest. id: unique within the simulation, e.g. from Context.newId("message")"""
+
+        self.id       = id
+        self.type     = type
+        self.value    = value
         self.senderId = senderId
 
     def __str__(self):
         type = {0: "tx", 1: "prevote", 2: "vote", 3: "block"}
-        return "message %s; type %s, val %s, sender %s" % (self.id, type[self.type], self.value, self.senderId)
-
-    
-        
+        value = self.value.hex()[:14] if isinstance(self.value, bytes) else self.value # block digests
+        return "message %s; type %s, val %s, sender %s" % (self.id, type[self.type], value, self.senderId)
@@ -0,0 +1,208 @@
+"""This module defines the MetricsCollector class, which records per heartbeat and per block metrics of a simulation
+into preallocated columnar buffers and flushes them to disk in chunks.
+
+Two tables are written next to the base path METRICS_FILE:
+  heartbeats: messages sent (per edge, before deduplication) and received per type, consensus stage transitions,
+              the height of the common chain, rounds without finality, mempool sizes and the stake distribution
+  blocks:     for every block that became common, the heartbeats it was proposed, first committed and became
+              common at
+
+With METRICS_FORMAT "npz", every chunk is a file <base>.<table>.<chunk>.npz; with "csv", chunks are appended to
+<base>.<table>.csv. readTable() reads a table back as a dict of column arrays.
+
+Snapshots keep the rows in memory and how much of each table was flushed; a resumed run writing to the same
+base path drops what was flushed after the snapshot (later npz chunks, or the tail of the csv file) and continues
+the tables, so they end up as if the run had never been interrupted.
+"""
+
+import glob
+import os
+
+import numpy as np
+
+TYPES = ("tx", "prevote", "vote", "block") # message types, indexed by Message.MessageType
+
+HEARTBEAT_COLUMNS = ([("heartbeat", np.int64)] +
+                     [("sent_" + i, np.int64) for i in TYPES] +
+                     [("received_" + i, np.int64) for i in TYPES] +
+                     [("prevotes", np.int64),                # players that entered the pre vote stage
+                      ("votes", np.int64),                   # players that entered the vote stage
+                      ("commits", np.int64),                 # blocks committed by players
+                      ("common_height", np.int64),           # height of the common chain, -1 if empty
+                      ("rounds_without_finality", np.int64), # rounds since the common chain last grew
+                      ("mempool_mean", np.float64),
+                      ("mempool_max", np.int64),
+                      ("stake_max_share", np.float64),
+                      ("stake_gini", np.float64)])
+
+BLOCK_COLUMNS = [("block", np.int64),
+                 ("proposer", np.int64),
+                 ("height", np.int64),
+                 ("proposed", np.int64),       # heartbeat the block was proposed at, -1 if unknown
+                 ("first_commit", np.int64),   # heartbeat the first player committed it at, -1 if unknown
+                 ("common", np.int64)]         # heartbeat it became part of the common chain
+
+class Table:
+    def __init__(self, columns, path, format, chunk):
+        """Creates a Table with columns, a list of (name, dtype), that holds chunk rows in memory and flushes
+           them to path (without extension) in format "npz" or "csv" """
+
+        if format not in ("npz", "csv"):
+            raise ValueError("unknown metrics format %s; expected npz or csv" % format)
+
+        self.names  = [i[0] for i in columns]
+        self.data   = dict((name, np.zeros(chunk, dtype)) for name, dtype in columns)
+        self.path   = path
+        self.format = format
+        self.chunk  = chunk
+        self.n      = 0 # rows in memory
+        self.chunks = 0 # chunks flushed
+        self.size   = 0 # bytes of the csv file after the last flush
+
+    def append(self, values):
+        """Appends one row, given as a sequence of values in column order"""
+
+        n = self.n
+        for name, value in zip(self.names, values):
+            self.data[name][n] = value
+
+        self.n = n+1
+        if self.n == self.chunk:
+            self.flush()
+
+    def flush(self):
+        """Writes the rows in memory to disk"""
+
+        if not self.n and self.chunks:
+            return
+
+        columns = [self.data[i][:self.n] for i in self.names]
+        if self.format == "npz":
+            with open("%s.%05d.npz" % (self.path, self.chunks), "wb") as f:
+                np.savez(f, **dict(zip(self.names, columns)))
+        else:
+            with open(self.path + ".csv", "a" if self.chunks else "w") as f:
+                if not self.chunks:
+                    f.write(",".join(self.names) + "\n")
+                for row in zip(*[i.tolist() for i in columns]):
+                    f.write(",".join(map(repr, row)) + "\n")
+                self.size = f.tell()
+
+        self.chunks += 1
+        self.n = 0
+
+    def resume(self):
+        """Discards what was flushed after this table was snapshotted, so flushing continues from there"""
+
+        if self.format == "csv":
+            if self.chunks and os.path.exists(self.path + ".csv"):
+                with open(self.path + ".csv", "r+b") as f:
+                    f.truncate(self.size)
+            return
+
+        for i in glob.glob(glob.escape(self.path + ".") + "[0-9]*.npz"):
+            if int(i[len(self.path)+1:-4]) >= self.chunks:
+                os.remove(i)
+
+class MetricsCollector:
+    def __init__(self, path, format="npz", chunk=65536):
+        """Creates a MetricsCollector writing the heartbeats and blocks tables next to path"""
+
+        self.path   = path
+        self.format = format
+
+        self.heartbeats = Table(HEARTBEAT_COLUMNS, path + ".heartbeats", format, chunk)
+        self.blocks     = Table(BLOCK_COLUMNS, path + ".blocks", format, chunk)
+
+        # counters of the current heartbeat, updated by the hooks in Player and PBFTConsensus
+        self.sent     = [0]*len(TYPES)
+        self.received = [0]*len(TYPES)
+        self.prevotes = 0
+        self.votes    = 0
+        self.commits  = 0
+
+        self.proposed    = {} # map of block id to heartbeat it was proposed at, until it becomes common
+        self.firstCommit = {} # map of block id to heartbeat it was first committed at, until it becomes common
+
+        self.roundsWithoutFinality = 0
+        self.lastHeight            = -1 # height of the common chain at the last round start
+        self.stakeMaxShare         = 0.0
+        self.stakeGini             = 0.0
+
+    @staticmethod
+    def fromOpts(opts, resumed=None):
+        """Returns the MetricsCollector configured by the METRICS_* options, or None if METRICS_FILE is not set.
+           resumed: the MetricsCollector of a snapshot, continued if it wrote the same tables"""
+
+        if not opts.get("METRICS_FILE"):
+            return None
+
+        format = opts.get("METRICS_FORMAT", "npz")
+        if resumed is not None and resumed.path == opts["METRICS_FILE"] and resumed.format == format:
+            resumed.heartbeats.resume()
+            resumed.blocks.resume()
+            return resumed
+
+        return MetricsCollector(opts["METRICS_FILE"], format, opts.get("METRICS_CHUNK", 65536))
+
+    def propose(self, nBlock, heartbeat):
+        self.proposed.setdefault(nBlock.id, heartbeat)
+
+    def commit(self, nBlock, heartbeat):
+        self.commits += 1
+        self.firstCommit.setdefault(nBlock.id, heartbeat)
+
+    def common(self, newBlocks, heartbeat):
+        """Records the blocks newBlocks, oldest first, that became part of the common chain at heartbeat"""
+
+        newest = -1
+        for i in newBlocks:
+            proposed = self.proposed.pop(i.id, -1)
+            newest   = max(newest, proposed)
+            self.blocks.append((i.id, i.proposer if i.proposer is not None else -1, i.height,
+                                proposed, self.firstCommit.pop(i.id, -1), heartbeat))
+
+        # proposals older than the newest common block can no longer become common
+        for i in [i for i, h in self.proposed.items() if h < newest]:
+            del self.proposed[i]
+            self.firstCommit.pop(i, None)
+
+    def record(self, sol):
+        """Appends the row of the heartbeat the solver sol just simulated and resets the counters"""
+
+        height = sol.blockchain.height if sol.blockchain is not None else -1
+
+        if sol.heartbeat % sol.N_HEARTBEATS_IN_ROUND == 0: # stakes and the common chain change at round starts
+            self.roundsWithoutFinality = 0 if height > self.lastHeight or sol.heartbeat == 0 else self.roundsWithoutFinality+1
+            self.lastHeight            = height
+
+            stakes = np.sort(sol.ledger.stakes)
+            total  = stakes.sum()
+            self.stakeMaxShare = stakes[-1]/total if total else 0.0
+            self.stakeGini     = (2*np.arange(1, len(stakes)+1) - len(stakes) - 1).dot(stakes)/(len(stakes)*total) if total else 0.0
+
+        sizes = [len(i.consensus.mempool) for i in sol.players]
+
+        self.heartbeats.append([sol.heartbeat] + self.sent + self.received +
+                               [self.prevotes, self.votes, self.commits, height, self.roundsWithoutFinality,
+                                sum(sizes)/len(sizes), max(sizes), self.stakeMaxShare, self.stakeGini])
+
+        self.sent     = [0]*len(TYPES)
+        self.received = [0]*len(TYPES)
+        self.prevotes = self.votes = self.commits = 0
+
+    def close(self):
+        """Flushes the rows still in memory"""
+
+        self.heartbeats.flush()
+        self.blocks.flush()
+
+def readTable(path, table, format="npz"):
+    """Reads the table ("heartbeats" or "blocks") written next to path back as a dict of column arrays"""
+
+    if format == "csv":
+        data = np.genfromtxt("%s.%s.csv" % (path, table), delimiter=",", names=True, ndmin=1)
+        return dict((i, data[i]) for i in data.dtype.names)
+
+    chunks = [np.load(i) for i in sorted(glob.glob(glob.escape("%s.%s." % (path, table)) + "[0-9]*.npz"))]
+    return dict((i, np.concatenate([c[i] for c in chunks])) for i in chunks[0].files)
@@ -1,31 +1,38 @@
 """Consensus class which accepts inbound messages from other players, processes the messages, and sends outbound messages"""
 
 import block
+import consensus
+import gossip
+import mempool
 import solver
 import transaction
 import states
 import message
+import tally
+import tracer
 
 import random
 import numpy as np
 
-VERBOSE = True
+Event = tracer.Event
 
-class PBFTConsensus:
+class PBFTConsensus(consensus.Consensus):
     id = 0
     
-    def __init__(self):
-        self.id = PBFTConsensus.id
-        PBFTConsensus.id += 1
+    def __init__(self, id=-1):
+        if id == -1:
+            id = PBFTConsensus.id
+            PBFTConsensus.id += 1
+        super().__init__(id)
 
-        self.blockchain      = None  # the current state of the player's blockchain
-        self.mempool         = set() # the current list of txs the player knows about
-        self.seenTxs         = set() # set of seen txs
-        self.seenBlocks      = {}    # map of blockId to block
-        self.committedBlocks = set()
+        self.mempool         = None  # Mempool of the txs the player knows about, set in setup
+        self.seenTxs         = None  # SeenFilter of seen txs
+        self.seenBlocks      = {}    # map of block digest to block
+        self.seenProposals   = None  # SeenFilter of the ids of the BLOCK messages (one per proposal) handled
+        self.committedBlocks = set() # set of committed block digests
 
-        self.preVotes    = {}
-        self.votes       = {}
+        self.preVotes    = None      # stake-weighted VoteTally of pre votes per block digest
+        self.votes       = None      # stake-weighted VoteTally of votes per block digest
 
         self.outbound = []
         self.inbound  = []
@@ -34,20 +41,33 @@ class PBFTConsensus:
 
         self.proposer  = False
 
+    def setup(self):
+        """Called by the solver once all players and their stakes exist"""
+
+        sol = self.player.solver
+
+        self.mempool  = mempool.Mempool(sol.MEMPOOL_CAPACITY, sol.MEMPOOL_POLICY)
+        self.seenTxs  = gossip.SeenFilter(sol.GOSSIP_FILTER_SIZE)
+        self.seenProposals = gossip.SeenFilter(sol.GOSSIP_FILTER_SIZE)
+        self.preVotes = tally.VoteTally(sol.ledger)
+        self.votes    = tally.VoteTally(sol.ledger)
+
     def roundInit(self):
         """Initializes instance variables and the such at the start of a new round"""
 
         outbound = []
 
-        if VERBOSE: print("\n%s"%self.player)
+        sol       = self.player.solver
+        heartbeat = sol.heartbeat
+        trace     = sol.tracer
 
-        heartbeat = self.player.solver.heartbeat
+        if trace.mask & Event.PLAYER: trace.emit(Event.PLAYER, heartbeat, self.player.id)
         
         # if start of round, reset node role
-        if heartbeat % solver.Solver.N_HEARTBEATS_IN_ROUND == 0:
-            if VERBOSE: print("STARTED NEW ROUND")
+        if heartbeat % sol.N_HEARTBEATS_IN_ROUND == 0:
+            if trace.mask & Event.ROUND: trace.emit(Event.ROUND, heartbeat, self.player.id)
             self.proposer  = False
-            if self.player.id == self.player.solver.propSet:
+            if self.player.id in self.player.solver.propSet:
                 self.proposer = True
 
             self.stage = states.States.Consensus.PRE_PRE_VOTE
@@ -56,122 +76,178 @@ class PBFTConsensus:
             self.votes.clear()
             
         # if proposer and at the start of round, propose block and send prevote
-        if heartbeat % solver.Solver.N_HEARTBEATS_IN_ROUND == 0 and self.proposer:
-            pBlock = self.proposeBlock()
-            outbound.append([message.Message(message.Message.MessageType.BLOCK, pBlock, self.player.id), heartbeat])
-            outbound.append([message.Message(message.Message.MessageType.PRE_VOTE, hash(pBlock), self.player.id), heartbeat])
-
-            self.seenBlocks[hash(pBlock)] = pBlock
-            self.preVotes[hash(pBlock)] = set([self.player.id])
+        if heartbeat % sol.N_HEARTBEATS_IN_ROUND == 0 and self.proposer:
+            pBlock   = self.proposeBlock()
+            proposal = self.newMessage(message.Message.MessageType.BLOCK, pBlock.digest)
+            outbound.append((proposal, heartbeat))
+            outbound.append((self.newMessage(message.Message.MessageType.PRE_VOTE, pBlock.digest), heartbeat))
+
+            self.seenBlocks[pBlock.digest] = pBlock
+            self.seenProposals.add(proposal.id)
+            self.preVotes.add(pBlock.digest, self.player.id)
             self.stage = states.States.Consensus.PRE_VOTE
             
-            if VERBOSE: print("proposed block")
+            if trace.mask & Event.PROPOSE: trace.emit(Event.PROPOSE, heartbeat, self.player.id, value=pBlock)
+            if sol.metrics is not None:
+                sol.metrics.propose(pBlock, heartbeat)
+                sol.metrics.prevotes += 1
                 
         # make transaction with probability p
-        if random.random() < self.player.P_TRANSACTIONS:
-            tx = self.makeTransaction()
-            outbound.append([message.Message(message.Message.MessageType.TRANSACTION, tx, self.player.id), heartbeat])
+        tx = sol.txgen.get(self.player.id, heartbeat, sol.P_TRANSACTIONS)
+        if tx is not None:
+            outbound.append((self.newMessage(message.Message.MessageType.TRANSACTION, tx), heartbeat))
             self.mempool.add(tx)
 
-        if VERBOSE: print("preVotes:", self.preVotes)
-        if VERBOSE: print("votes:", self.votes)
+        if trace.mask & Event.VOTES: trace.emit(Event.VOTES, heartbeat, self.player.id, value=(self.preVotes, self.votes))
 
         return outbound
 
     def processMessage(self, msg):
         """Process a message at specified heartbeat"""
 
+        return [i[0] for i in PBFTConsensus.processBatch(self, [(msg, None)])]
+
+    def processBatch(self, batch):
+        """Processes the due messages in batch. Pre votes and votes are tallied as they come, but quorums are
+           checked once per voted block at the end of the batch. The vote a pre vote quorum causes gets the
+           timestamp of the message that made it possible, as if the quorum had been checked after every message:
+           the pre vote that crossed 2/3 of the stake, or the block if it arrived after that"""
+
         outbound = []
-        
-        # if inbound message is transaction, add to local mempool
-        if msg.type == message.Message.MessageType.TRANSACTION:
-            if msg.value in self.seenTxs:
-                return outbound
-             
-            self.mempool.add(msg.value)
-            self.seenTxs.add(msg.value)
-
-            outbound.append(msg)
-
-        # handle pre pre vote
-        if self.stage == states.States.Consensus.PRE_PRE_VOTE and msg.type == message.Message.MessageType.BLOCK:
-            # message value is block
-            if hash(msg.value) in self.seenBlocks:
-                return outbound
-                
-            self.seenBlocks[hash(msg.value)] = msg.value
-                    
-            if self.isValid(msg.value):
-                pv = hash(msg.value)
-                if VERBOSE: print("pre pre vote valid; moved to pre vote")
-            else:
-                pv = None
-                if VERBOSE: print("pre pre vote invalid; moved to pre vote")
-
-            outbound.append(msg)
-            outbound.append(message.Message(message.Message.MessageType.PRE_VOTE, pv, self.player.id))
-            self.preVotes[pv] = set([self.player.id])
-            self.stage = states.States.Consensus.PRE_VOTE
-            # todo: add timeout
-
-        # handle pre vote
-        if self.stage == states.States.Consensus.PRE_VOTE and msg.type == message.Message.MessageType.PRE_VOTE:
-            # message value is block hash
-            if msg.value not in self.preVotes:
-                self.preVotes[msg.value] = set()
-
-            if msg.senderId not in self.preVotes[msg.value]:
-                self.preVotes[msg.value].add(msg.senderId)
-                outbound.append(msg)
-
-            if len(self.preVotes[msg.value]) >= 2*self.player.solver.N_PLAYERS/3:
-                self.stage = states.States.Consensus.VOTE
-                self.votes[msg.value] = set([self.player.id])
-                outbound.append(message.Message(message.Message.MessageType.VOTE, msg.value, self.player.id))
-                if VERBOSE: print("moved to vote stage")
-
-        # handle vote
-        if self.stage == states.States.Consensus.VOTE and msg.type == message.Message.MessageType.VOTE:
-            if msg.value not in self.votes:
-                self.votes[msg.value] = set()
-
-            if msg.senderId not in self.votes[msg.value]:
-                self.votes[msg.value].add(msg.senderId)
-                outbound.append(msg)
-
-            if len(self.votes[msg.value]) >= 2*self.player.solver.N_PLAYERS/3 and msg.value not in self.committedBlocks:
-                self.committedBlocks.add(msg.value)
-
-                nBlock = self.seenBlocks[msg.value].copy()
-                if VERBOSE: print("committed block %s" % (nBlock))
-                nBlock.next = self.blockchain
+        voted    = {} # map of block digest to the timestamp of the message after which its quorums must be checked,
+                      # in the order of those messages
+
+        MessageType = message.Message.MessageType
+        for msg, timestamp in batch:
+            # handle pre vote; pre votes are tallied in every stage, since gossip delivers each one only once
+            if msg.type == MessageType.PRE_VOTE:
+                # message value is block digest; the running stake sum tells whether this pre vote crossed 2/3
+                reached = self.preVotes.hasQuorum(msg.value)
+                if self.preVotes.add(msg.value, msg.senderId):
+                    outbound.append((msg, timestamp))
+                    if not reached and self.preVotes.hasQuorum(msg.value):
+                        voted.pop(msg.value, None)
+                        voted[msg.value] = timestamp
+
+            # handle vote
+            elif msg.type == MessageType.VOTE:
+                if self.votes.add(msg.value, msg.senderId):
+                    outbound.append((msg, timestamp))
+                    voted.setdefault(msg.value, timestamp) # commits send nothing, so any timestamp will do
+
+            # if inbound message is transaction, add to local mempool
+            elif msg.type == MessageType.TRANSACTION:
+                if msg.value in self.seenTxs:
+                    continue
+
+                self.mempool.add(msg.value)
+                self.seenTxs.add(msg.value)
+
+                outbound.append((msg, timestamp))
+
+            # handle pre pre vote
+            elif msg.type == MessageType.BLOCK and self.stage == states.States.Consensus.PRE_PRE_VOTE:
+                # message value is block digest; the block itself is in the block store. Proposals are told apart
+                # by message id, not digest: a block proposed again after a failed round (e.g. an empty block on
+                # the same parent) has the digest of the one seen before, but must be pre voted again
+                if not self.seenProposals.add(msg.id):
+                    continue
+
+                nBlock = self.player.solver.blockStore.get(msg.value)
+                self.seenBlocks[msg.value] = nBlock
+
+                valid = self.isValid(nBlock)
+                pv    = msg.value if valid else None
+                if self.player.solver.tracer.mask & Event.PRE_VOTE:
+                    self.player.solver.tracer.emit(Event.PRE_VOTE, self.player.solver.heartbeat, self.player.id, value=valid)
+
+                outbound.append((msg, timestamp))
+                outbound.append((self.newMessage(MessageType.PRE_VOTE, pv), timestamp))
+                self.preVotes.add(pv, self.player.id)
+                self.stage = states.States.Consensus.PRE_VOTE
+                if self.player.solver.metrics is not None: self.player.solver.metrics.prevotes += 1
+                # todo: add timeout
+
+                # pre votes and votes that arrived before the block may already form a quorum
+                voted.pop(pv, None)
+                voted[pv] = timestamp
+
+        for value, timestamp in voted.items():
+            reached = []
+            self.checkPreVotes(value, reached)
+            self.checkVotes(value)
+            outbound.extend((i, timestamp) for i in reached)
+
+        return outbound
+
+    def checkPreVotes(self, value, outbound):
+        """Moves to the vote stage if the pre votes for value reached quorum"""
+
+        if self.stage == states.States.Consensus.PRE_VOTE and self.preVotes.hasQuorum(value): # 2/3 of the total stake
+            self.stage = states.States.Consensus.VOTE
+            self.votes.add(value, self.player.id)
+            outbound.append(self.newMessage(message.Message.MessageType.VOTE, value))
+
+            trace = self.player.solver.tracer
+            if trace.mask & Event.VOTE: trace.emit(Event.VOTE, self.player.solver.heartbeat, self.player.id)
+            if self.player.solver.metrics is not None: self.player.solver.metrics.votes += 1
+
+            self.checkVotes(value)
+
+    def checkVotes(self, value):
+        """Commits the block with digest value if its votes reached quorum"""
+
+        if self.stage == states.States.Consensus.VOTE and value in self.seenBlocks and value not in self.committedBlocks:
+            if self.votes.hasQuorum(value):
+                self.committedBlocks.add(value)
+
+                # shared copy of the block on top of the local chain
+                nBlock = self.player.solver.blockStore.rebase(self.seenBlocks[value], self.blockchain)
+
+                trace = self.player.solver.tracer
+                if trace.mask & Event.COMMIT: trace.emit(Event.COMMIT, self.player.solver.heartbeat, self.player.id, value=nBlock)
+                if self.player.solver.metrics is not None: self.player.solver.metrics.commit(nBlock, self.player.solver.heartbeat)
+                if self.player.solver.chainlog is not None: self.player.solver.chainlog.commit(nBlock, self.player.solver.heartbeat, self.player.id)
                 self.blockchain = nBlock
 
                 # remove txs from local mempool
                 for tx in nBlock.txs:
-                    if tx in self.mempool:
-                        self.mempool.remove(tx)
-                        
-        return outbound
+                    self.mempool.remove(tx)
+
+    def prune(self, final):
+        """Discards the state of blocks proposed at or below the height of the finalized block final; they can
+           no longer be committed, since every proposal after finality builds on top of final"""
+
+        stale = [d for d, b in self.seenBlocks.items() if b.height <= final.height]
+        for d in stale:
+            del self.seenBlocks[d]
+            self.committedBlocks.discard(d)
 
     def isValid(self, block):
         """Returns whether a block is valid or not"""
         
         return True
     
-    def makeTransaction(self):
-        """Returns a random transaction"""
+    def newMessage(self, type, value):
+        """Returns a new message from this player"""
 
-        fee = max(random.gauss(self.player.MEAN_TX_FEE, self.player.STD_TX_FEE), 0)
-        return transaction.Transaction(self.player.id, 0, fee)
+        return message.Message(type, value, self.player.id, self.player.context.newId("message"))
 
     def proposeBlock(self):
-        """Proposes a Block consisting of multiple random transactions"""
+        """Proposes a Block of the best paying (or random, see MEMPOOL_POLICY) transactions in the mempool"""
         
-        txs = random.sample(self.mempool, min(self.player.N_TRANSACTIONS, len(self.mempool)))
+        sol = self.player.solver
+        txs = self.mempool.select(sol.N_TRANSACTIONS, self.player.context.random)
+
+        return sol.blockStore.extend(txs, self.blockchain, self.player.context.newId("block"), self.player.id)
+
+class SerialPBFTConsensus(PBFTConsensus):
+    """PBFT that processes its inbox one message at a time and checks the quorum after every vote; the baseline
+       that processBatch is benchmarked against"""
 
-        return block.Block(txs, proposer=self.player)
+    def processBatch(self, batch):
+        return consensus.Consensus.processBatch(self, batch)
 
-    def getBlockchain(self):
-        return self.blockchain
+consensus.register("pbft", PBFTConsensus)
+consensus.register("pbft-serial", SerialPBFTConsensus)
         
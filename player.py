@@ -2,16 +2,18 @@
 """
 
 import block
+import consensus
 import solver
 import transaction
 import states
 import message
 import pbftconsensus
+import tracer
 
 import random
 import numpy as np
 
-VERBOSE = pbftconsensus.VERBOSE
+Event = tracer.Event
 
 class Player:
     id = 0 # player id
@@ -19,54 +21,181 @@ class Player:
     MEAN_TX_FEE = 0.2  # mean transaction fee
     STD_TX_FEE  = 0.05 # std of transaction fee
 
-    def __init__(self, stake):
-        """Creates a new Player object"""
+    def __init__(self, stake, id=-1, mechanism="pbft"):
+        """Creates a new Player object running the consensus mechanism registered as mechanism"""
 
-        self.id = Player.id # the player's id
-        Player.id += 1                 
+        if id == -1:
+            self.id = Player.id # the player's id
+            Player.id += 1
+        else:
+            self.id = id
 
-        self.stake = stake  # the number of tokens the player has staked in the system
+        self.initialStake = stake # the number of tokens the player has staked in the system at the start
+        self.ledger       = None  # the solver's StakeLedger, which holds the current stake
 
-        self.blockchain  = None # blockchain
-        self.connections = []   # list of connected players
-        self.inbound     = []   # inbound messages from other players in the network at heartbeat r
+        self.finality    = None # the solver's FinalityTracker, told about every change of the chain tip
+        self._blockchain = None # tip of the player's chain, see blockchain
+        self.connections = []   # ids of connected players (a view into the solver's topology)
+        self.inbound     = None # inbox of messages from other players in the network, set by the solver
         self.outbound    = []   # outbound messages to other players in the network at heartbeat r
+        self.seen        = None # SeenFilter of the ids of messages sent to or by the player, set by the solver
+        self.pending     = {}   # map of message id to the arrival time of its queued copy, if GOSSIP_DEDUP is set
+        self.context     = None # random generators and id allocators, set by the solver
 
-        self.consensus = pbftconsensus.PBFTConsensus()
+        self.consensus = consensus.make(mechanism, self.id)
         self.consensus.player = self
 
+    @property
+    def stake(self):
+        """The number of tokens the player has staked in the system"""
+
+        if self.ledger is None:
+            return self.initialStake
+        return self.ledger.stakes[self.id]
+
+    @stake.setter
+    def stake(self, stake):
+        if self.ledger is None:
+            self.initialStake = stake
+        else:
+            self.ledger.set(self.id, stake)
+
+    @property
+    def blockchain(self):
+        """The tip of the player's chain"""
+
+        return self._blockchain
+
+    @blockchain.setter
+    def blockchain(self, tip):
+        if tip is self._blockchain:
+            return
+        if self.finality is not None:
+            self.finality.move(self.id, self._blockchain, tip, self.solver.heartbeat)
+        self._blockchain = tip
+
     def action(self, heartbeat):
         """Executes the player's actions for heartbeat r"""
 
         self.outbound += self.consensus.roundInit() # remove in real version
         
-        for msg, timestamp in self.inbound:
-            if timestamp > heartbeat:
-                if VERBOSE: print("received %s but timestamp > heartbeat" % msg)
-                continue
-            if VERBOSE: print("received %s" % msg)
-
-            received = self.consensus.processMessage(msg)
-            received = zip(received, [timestamp]*len(received))
-            
-            self.outbound += received
-            
-        self.inbound = list(filter(lambda x: x[1] > heartbeat, self.inbound)) # get rid of processed messages
-        
+        due = [i for i in self.inbound.popDue(heartbeat) if self.claim(*i)] # only messages that are due
+        if due:
+            self.receive(due)
+
         self.blockchain = self.consensus.getBlockchain() # update blockchain from consensus scheme results
 
         self.sendOutbound() # send messages to connected players
 
-    def sendOutbound(self):
-        """Send all outbound connections to connected nodes"""
-        
-        for i in self.connections:
-            for message, timestamp in self.outbound:
-                dt = np.random.exponential(self.MEAN_PROP_TIME) # add propagation time to timestamp
-                print("sent %s to %s" % (message, i))
-                i.inbound.append([message, timestamp+dt])
+    def receive(self, batch):
+        """Processes batch, the inbound (message, delivery time) pairs due, in one call to the consensus"""
 
-        self.outbound.clear()
+        trace = self.solver.tracer
+        if trace.mask & Event.RECEIVE:
+            for msg, timestamp in batch:
+                trace.emit(Event.RECEIVE, self.solver.heartbeat, self.id, msg=msg)
+        if self.solver.metrics is not None:
+            received = self.solver.metrics.received
+            for msg, timestamp in batch:
+                received[msg.type] += 1
+
+        self.outbound += self.consensus.processBatch(batch)
+
+    def handle(self, msg, timestamp):
+        """Processes an inbound message and immediately sends the results (continuous engine)"""
+
+        if not self.claim(msg, timestamp):
+            return
+
+        self.receive([(msg, timestamp)])
+
+        self.blockchain = self.consensus.getBlockchain()
+
+        self.sendOutbound()
+
+    def claim(self, msg, timestamp):
+        """Returns whether msg arriving at timestamp is the copy of it to process, and if so marks it processed.
+           With GOSSIP_DEDUP, that is the earliest copy queued; copies it superseded are dropped"""
+
+        if not self.solver.GOSSIP_DEDUP:
+            return True
+
+        if self.pending.get(msg.id) != timestamp:
+            return False
+
+        del self.pending[msg.id]
+        return True
+
+    def sendOutbound(self):
+        """Broadcast all outbound messages to connected nodes. The propagation delays of the whole fan-out are
+           drawn in one call, in the same (connection, message) order as one draw per edge would be"""
+
+        outbound = self.outbound
+        if not outbound or len(self.connections) == 0:
+            outbound.clear()
+            return
+
+        sol        = self.solver
+        msgs       = [msg for msg, timestamp in outbound] # shared by all recipients
+        timestamps = np.array([timestamp for msg, timestamp in outbound])
+
+        rng      = self.context.nprandom
+        dts      = rng.exponential(sol.MEAN_PROP_TIME, size=(len(self.connections), len(msgs)))
+        arrivals = (timestamps + dts).tolist() # add propagation time to timestamps
+
+        # messages the player did not receive are new; mark them so that echoes are dropped
+        stats = sol.gossip
+        for msg in msgs:
+            stats.unique += self.seen.add(msg.id)
+        stats.sent += len(self.connections)*len(msgs)
+
+        if sol.metrics is not None:
+            sent = sol.metrics.sent
+            for msg in msgs:
+                sent[msg.type] += len(self.connections)
+
+        players = sol.players
+        outbox  = sol.outbox
+        for j, times in zip(self.connections.tolist(), arrivals):
+            if outbox is not None: # bsp engine: delivered at the end of the heartbeat (see bsp.py)
+                outbox.append((self.id, j, msgs, times))
+            else:
+                players[j].deliver(msgs, times, self.id)
+
+        outbound.clear()
+
+    def deliver(self, msgs, times, senderId):
+        """Queues msgs from player senderId for delivery at times. The player's filter is checked before
+           queueing, so messages it has already seen are dropped if GOSSIP_DEDUP is set. Copies are not queued
+           in arrival order, so a copy that arrives earlier than the queued one is queued too and supersedes it
+           (see claim); the player always processes the earliest copy of a message"""
+
+        sol     = self.solver
+        seen    = self.seen
+        fresh   = [j for j in range(len(msgs)) if seen.add(msgs[j].id)]
+        pending = self.pending
+
+        if len(fresh) < len(msgs):
+            stats = sol.gossip
+            stats.redundant += len(msgs) - len(fresh)
+            if sol.GOSSIP_DEDUP:
+                stats.dropped += len(msgs) - len(fresh) # either this copy or the one it supersedes
+
+                earlier = set(j for j in range(len(msgs)) if times[j] < pending.get(msgs[j].id, times[j]))
+                if earlier:
+                    fresh = sorted(earlier.union(fresh))
+                msgs  = [msgs[j] for j in fresh]
+                times = [times[j] for j in fresh]
+
+        if sol.GOSSIP_DEDUP:
+            for msg, time in zip(msgs, times):
+                pending[msg.id] = time
+
+        trace = sol.tracer
+        if trace.mask & Event.SEND:
+            for msg in msgs:
+                trace.emit(Event.SEND, sol.heartbeat, senderId, self.id, msg=msg)
+        self.inbound.pushMany(msgs, times)
 
     def __str__(self):
         return "player %s" % (self.id)
@@ -0,0 +1,112 @@
+"""This module defines the Profiler class, which runs a simulation under cProfile and times its main phases.
+
+Phase timers are installed by wrapping the phase methods on their classes when profiling starts, and removed when
+it stops, so the simulation code has no hooks and pays nothing when profiling is off. The phases do not nest, so
+their times add up to the part of the run they cover.
+"""
+
+import pbftconsensus
+import player
+import scheduler
+import solver
+
+import cProfile
+import functools
+import pstats
+import time
+import types
+
+# phase name, class and method timed for it
+PHASES = [("roundInit",         pbftconsensus.PBFTConsensus, "roundInit"),
+          ("processBatch",      pbftconsensus.PBFTConsensus, "processBatch"),
+          ("sendOutbound",      player.Player,               "sendOutbound"),
+          ("inbound filter",    scheduler.ListInbox,         "popDue"),
+          ("inbound filter",    scheduler.HeapInbox,         "popDue"),
+          ("updateCommonChain", solver.Solver,               "updateCommonChain")]
+
+class Profiler:
+    def __init__(self, path=None):
+        """Creates a Profiler that saves the cProfile stats to path, if given"""
+
+        self.path    = path
+        self.profile = cProfile.Profile()
+        self.seconds = dict((i[0], 0.0) for i in PHASES) # cumulative wall-clock time per phase
+        self.calls   = dict((i[0], 0) for i in PHASES)
+        self.total   = 0.0
+
+        self.originals = [] # (class, method name, original function) of the installed timers
+
+    def timed(self, name, function):
+        """Returns function wrapped to add its wall-clock time to phase name. Generators are timed per step,
+           so the time their consumer spends between steps is not counted"""
+
+        seconds, calls = self.seconds, self.calls
+
+        def steps(generator):
+            while True:
+                start = time.perf_counter()
+                try:
+                    value = next(generator)
+                except StopIteration:
+                    seconds[name] += time.perf_counter() - start
+                    return
+                seconds[name] += time.perf_counter() - start
+                yield value
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            calls[name] += 1
+            start  = time.perf_counter()
+            result = function(*args, **kwargs)
+            seconds[name] += time.perf_counter() - start
+
+            if isinstance(result, types.GeneratorType):
+                return steps(result)
+            return result
+
+        return wrapper
+
+    def start(self):
+        for name, cls, method in PHASES:
+            self.originals.append((cls, method, cls.__dict__[method]))
+            setattr(cls, method, self.timed(name, cls.__dict__[method]))
+
+        self.started = time.perf_counter()
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+        self.total += time.perf_counter() - self.started
+
+        for cls, method, function in reversed(self.originals):
+            setattr(cls, method, function)
+        self.originals = []
+
+        if self.path is not None:
+            self.profile.dump_stats(self.path)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def stats(self):
+        """Returns the pstats.Stats of the profiled run"""
+
+        return pstats.Stats(self.profile)
+
+    def report(self):
+        """Returns the per phase breakdown as a table"""
+
+        lines = ["%-18s %10s %10s %8s" % ("phase", "calls", "seconds", "share")]
+        for name in self.seconds:
+            lines.append("%-18s %10d %10.3f %7.1f%%" % (name, self.calls[name], self.seconds[name],
+                                                        100*self.seconds[name]/self.total if self.total else 0))
+
+        other = self.total - sum(self.seconds.values())
+        lines.append("%-18s %10s %10.3f %7.1f%%" % ("other", "", other, 100*other/self.total if self.total else 0))
+        lines.append("%-18s %10s %10.3f" % ("total", "", self.total))
+
+        return "\n".join(lines)
@@ -0,0 +1,82 @@
+"""This module defines the StakeSampler class, which draws players with probability proportional to their stake.
+
+The stakes are kept in a Fenwick (binary indexed) tree of cumulative sums, so that a draw and a stake update
+both take O(log n), and fractional stakes are supported. Committees of k players are drawn without
+replacement in O(k log n) by zeroing the stake of every chosen player until the committee is complete.
+"""
+
+class StakeSampler:
+    def __init__(self, weights):
+        """Creates a StakeSampler over weights, a list of non-negative stakes indexed by player"""
+
+        self.n         = len(weights)
+        self.weights   = [float(i) for i in weights]
+        self.total     = sum(self.weights)
+        self.nPositive = sum(1 for i in self.weights if i > 0) # number of players that can be drawn
+
+        # Fenwick tree; tree[i] holds the sum of weights in (i - lowbit(i), i], 1-indexed
+        self.tree = [0.0] + self.weights
+        for i in range(1, self.n+1):
+            parent = i + (i & -i)
+            if parent <= self.n:
+                self.tree[parent] += self.tree[i]
+
+        self.top = 1 << (self.n.bit_length()-1) if self.n else 0 # highest power of two <= n
+
+    def update(self, i, delta):
+        """Adds delta to the weight of player i"""
+
+        self.nPositive -= self.weights[i] > 0
+        self.weights[i] += delta
+        self.total      += delta
+        self.nPositive += self.weights[i] > 0
+
+        i += 1
+        while i <= self.n:
+            self.tree[i] += delta
+            i += i & -i
+
+    def set(self, i, weight):
+        """Sets the weight of player i"""
+
+        self.update(i, weight - self.weights[i])
+
+    def find(self, u):
+        """Returns the player i with prefix(i) <= u < prefix(i+1), where prefix(i) is the sum of the first i weights"""
+
+        pos  = 0
+        step = self.top
+        while step:
+            nxt = pos + step
+            if nxt <= self.n and self.tree[nxt] <= u:
+                pos = nxt
+                u  -= self.tree[nxt]
+            step >>= 1
+
+        # guard against rounding at the upper end
+        while pos >= self.n or self.weights[pos] <= 0:
+            pos -= 1
+
+        return pos
+
+    def sample(self, rng):
+        """Draws one player with probability proportional to weight; rng is a random.Random"""
+
+        return self.find(rng.random()*self.total)
+
+    def sampleWithout(self, k, rng):
+        """Draws k distinct players; each draw is proportional to the weights of the players not drawn yet"""
+
+        if k > self.nPositive:
+            raise ValueError("cannot draw %s distinct players with positive stake" % k)
+
+        chosen = []
+        for i in range(k):
+            j = self.sample(rng)
+            chosen.append((j, self.weights[j]))
+            self.set(j, 0.0)
+
+        for j, weight in chosen: # restore the weights of the chosen players
+            self.set(j, weight)
+
+        return [j for j, weight in chosen]
@@ -0,0 +1,107 @@
+"""This module defines the inboxes and the event queue which schedule the delivery of messages between players.
+
+Three engines are supported (see Solver.ENGINES):
+  heartbeat:  compatibility mode; each inbox is a plain list that is scanned in full every heartbeat
+  event:      each inbox is a heap keyed on delivery time, so only messages that are due are touched
+  continuous: every delivery is an event on one global heap and is processed at its exact time instead
+              of being rounded up to the next heartbeat
+"""
+
+import heapq
+
+class ListInbox:
+    """Inbox that keeps messages in arrival order and scans all of them every heartbeat"""
+
+    def __init__(self):
+        self.messages = [] # list of [message, timestamp]
+
+    def push(self, msg, timestamp):
+        self.messages.append([msg, timestamp])
+
+    def pushMany(self, msgs, timestamps):
+        self.messages.extend([list(i) for i in zip(msgs, timestamps)])
+
+    def popDue(self, heartbeat):
+        """Returns all messages with timestamp <= heartbeat, in arrival order, and removes them from the inbox"""
+
+        due = [i for i in self.messages if i[1] <= heartbeat]
+        self.messages = [i for i in self.messages if i[1] > heartbeat]
+
+        return due
+
+    def __len__(self):
+        return len(self.messages)
+
+class HeapInbox:
+    """Inbox that keeps messages in a heap keyed on delivery time"""
+
+    def __init__(self):
+        self.heap = [] # heap of (timestamp, seq, message)
+        self.seq  = 0  # tie breaker so messages with equal timestamps are delivered in send order
+
+    def push(self, msg, timestamp):
+        heapq.heappush(self.heap, (timestamp, self.seq, msg))
+        self.seq += 1
+
+    def pushMany(self, msgs, timestamps):
+        heap = self.heap
+        seq  = self.seq
+        for msg, timestamp in zip(msgs, timestamps):
+            heapq.heappush(heap, (timestamp, seq, msg))
+            seq += 1
+        self.seq = seq
+
+    def popDue(self, heartbeat):
+        """Yields (message, timestamp) for all messages with timestamp <= heartbeat, in delivery order"""
+
+        heap = self.heap
+        while heap and heap[0][0] <= heartbeat:
+            timestamp, seq, msg = heapq.heappop(heap)
+            yield msg, timestamp
+
+    def __len__(self):
+        return len(self.heap)
+
+class EventQueue:
+    """Global heap of message deliveries used by the continuous engine"""
+
+    def __init__(self):
+        self.heap = [] # heap of (timestamp, seq, player, message)
+        self.seq  = 0
+
+    def push(self, timestamp, player, msg):
+        heapq.heappush(self.heap, (timestamp, self.seq, player, msg))
+        self.seq += 1
+
+    def runUntil(self, end):
+        """Delivers every message with timestamp < end, in delivery order, at its exact timestamp"""
+
+        heap = self.heap
+        while heap and heap[0][0] < end:
+            timestamp, seq, player, msg = heapq.heappop(heap)
+            player.handle(msg, timestamp)
+
+    def __len__(self):
+        return len(self.heap)
+
+class QueueInbox:
+    """Inbox of a single player that forwards deliveries to the global EventQueue"""
+
+    def __init__(self, queue, player):
+        self.queue  = queue
+        self.player = player
+
+    def push(self, msg, timestamp):
+        self.queue.push(timestamp, self.player, msg)
+
+    def pushMany(self, msgs, timestamps):
+        for msg, timestamp in zip(msgs, timestamps):
+            self.queue.push(timestamp, self.player, msg)
+
+    def popDue(self, heartbeat):
+        """Deliveries are driven by the EventQueue, so there is never anything to pop here"""
+
+        return ()
+
+    def __len__(self):
+        return sum(1 for i in self.queue.heap if i[2] is self.player)
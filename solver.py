@@ -2,141 +2,324 @@
 """
 
 import block
+import blockstore
+import bsp
+import chainlog
+import checkpoint
+import context
+import finality
+import gossip
 import player
 import transaction
+import ledger
+import metrics
 import pbftconsensus
+import sampler
+import scheduler
+import topology
+import tracer
+import txgen
 
 import math
+import os
 import random
 import statistics
 
 class Solver:
+    ENGINES = ("heartbeat", "event", "continuous", "bsp") # see scheduler.py and bsp.py
+
     def __init__(self, opts):
         """Initiates the solver class with the list of players and number of rounds"""
 
+        # simulation parameters; kept per instance so that simulations in one process do not interfere
+        self.N_VALIDATORS          = opts["N_VALIDATORS"]
+        self.N_PROPOSERS           = opts["N_PROPOSERS"]
+        self.N_CONNECTIONS         = opts["N_CONNECTIONS"]
+        self.TOPOLOGY              = opts.get("TOPOLOGY", "random")   # see topology.TOPOLOGIES
+        self.TOPOLOGY_BETA         = opts.get("TOPOLOGY_BETA", 0.1)   # rewiring probability of small-world networks
+        self.TOPOLOGY_FILE         = opts.get("TOPOLOGY_FILE")        # load the network from / save it to this file
+        self.N_HEARTBEATS_IN_ROUND = opts["N_HEARTBEATS_IN_ROUND"]
+        self.N_ROUNDS              = opts["N_ROUNDS"]
+        self.N_TRANSACTIONS        = opts["N_TRANSACTIONS"]
+        self.P_TRANSACTIONS        = opts["P_TRANSACTIONS"]
+        self.MEAN_PROP_TIME        = opts["MEAN_PROP_TIME"]
+        self.GOSSIP_DEDUP          = opts.get("GOSSIP_DEDUP", True)        # drop messages a player has already seen
+        self.GOSSIP_FILTER_SIZE    = opts.get("GOSSIP_FILTER_SIZE", 65536) # message ids remembered per player
+        self.MEMPOOL_CAPACITY      = opts.get("MEMPOOL_CAPACITY", 0)       # txs held per player, 0 for unbounded
+        self.MEMPOOL_POLICY        = opts.get("MEMPOOL_POLICY", "fee")     # "fee" or "random" block selection
+        self.PRUNE_DEPTH           = opts.get("PRUNE_DEPTH")               # finalized blocks kept below the common tip; None keeps all
+        self.CHECKPOINT_EVERY      = opts.get("CHECKPOINT_EVERY", 0)       # write a snapshot every n rounds; 0 never
+        self.CHECKPOINT_FILE       = opts.get("CHECKPOINT_FILE", "checkpoint.pkl.gz") # may contain {round}
+        self.SHARDS                = opts.get("SHARDS", 1)                 # bsp engine: number of worker processes
+        self.CONSENSUS             = opts.get("CONSENSUS", "pbft")         # consensus mechanism, see consensus.py
+
+        self.context = context.Context(opts.get("SEED")) # random generators and id allocators
+
         self.players = [] # the list of nodes in the system
         for nPlayers, stake in opts["PLAYERS"]:
-            self.players.extend([player.Player(stake) for i in range(nPlayers)])
+            self.players.extend([player.Player(stake, self.context.newId("player"), self.CONSENSUS) for i in range(nPlayers)])
             
-        self.nHeartbeats = opts["N_ROUNDS"]*Solver.N_HEARTBEATS_IN_ROUND # number of total heartbeats
+        self.nHeartbeats = opts["N_ROUNDS"]*self.N_HEARTBEATS_IN_ROUND # number of total heartbeats
         self.heartbeat   = 0                                             # the heartbeat, or clock, of the system
+        self.done        = 0                                             # number of heartbeats simulated so far
 
         self.blockchain = None # common blockchain among all players
+        self.blockStore = blockstore.BlockStore() # all blocks of all players
+
+        self.tracer   = tracer.Tracer.fromOpts(opts)     # event tracing; off unless TRACE_LEVEL is set
+        self.chainlog = chainlog.ChainLog.fromOpts(opts) # streamed commits and common blocks, if CHAIN_FILE is set
+
+        self.engine = opts.get("ENGINE", "event") # message delivery engine
+        if self.engine not in Solver.ENGINES:
+            raise ValueError("unknown engine %s; expected one of %s" % (self.engine, ", ".join(Solver.ENGINES)))
+
+        self.events = scheduler.EventQueue() if self.engine == "continuous" else None
+        self.gossip = gossip.GossipStats()
+
+        self.metrics = metrics.MetricsCollector.fromOpts(opts) # per heartbeat and per block metrics, if METRICS_FILE is set
+
+        self.N_PLAYERS = len(self.players)
 
-        # add pointer to solver to players
+        # add pointer to solver and inbox to players
         for i in self.players:
             i.solver = self
+            i.inbound = self.makeInbox(i)
+            i.seen    = gossip.SeenFilter(self.GOSSIP_FILTER_SIZE)
+            i.context = context.PlayerContext(self.context.seed, i.id, self.N_PLAYERS) if self.engine == "bsp" else self.context
 
-        self.N_PLAYERS = len(self.players)
+        # players per chain tip, told about every change of a player's tip
+        self.finality = finality.FinalityTracker(self.players)
+        for i in self.players:
+            i.finality = self.finality
+
+        self.outbox = [] if self.engine == "bsp" else None # messages sent in this heartbeat, see bsp.py
+        self.shards = bsp.ShardedEngine(self, self.SHARDS) if self.engine == "bsp" else None
+        if self.SHARDS > 1 and (self.tracer.mask or self.metrics is not None or self.CHECKPOINT_EVERY or self.chainlog is not None):
+            raise ValueError("tracing, metrics, chain files and checkpoints need the players in one process (SHARDS = 1)")
+
+        # transactions of all players, drawn per player id and heartbeat from streams of the seed
+        seed = self.context.seed if self.context.seed is not None else self.context.random.getrandbits(64)
+        self.txgen = txgen.TransactionGenerator(seed, self.N_PLAYERS, player.Player.MEAN_TX_FEE, player.Player.STD_TX_FEE)
+
+        # stakes of all players, indexed by player id, and stake-weighted selection over them
+        self.sampler = sampler.StakeSampler([i.stake for i in self.players])
+        self.ledger  = ledger.StakeLedger([i.stake for i in self.players], self.sampler)
+        for i in self.players:
+            i.ledger = self.ledger
+            i.consensus.setup()
+
+        self.recordStakes = opts.get("RECORD_STAKES", False) # snapshot stakes at the start of every round
+        if self.recordStakes:
+            self.ledger.reserve(self.N_ROUNDS+1)
+
+        self.propSet = [] # ids of the proposers of the current round
+        self.valSet  = [] # ids of the validators of the current round
+
+        self.committees = {} # map of round to the ids of its validators, kept until its blocks may have been paid
             
         self.connectNetwork()
 
-        print("==NETWORK CONNECTIONS==")
-        for i in self.players:
-            print("%s: %s" % (i, i.connections))
+        if self.tracer.mask & tracer.Event.CONNECT:
+            for i in self.players:
+                for j in i.connections.tolist():
+                    self.tracer.emit(tracer.Event.CONNECT, 0, i.id, j)
+
+    def makeInbox(self, player):
+        """Returns a new inbox for player, according to the engine"""
+
+        if self.engine == "heartbeat":
+            return scheduler.ListInbox()
+        if self.engine in ("event", "bsp"):
+            return scheduler.HeapInbox()
+        return scheduler.QueueInbox(self.events, player)
 
     def connectNetwork(self):
-        """Form the network of players through random assignment of connections"""
+        """Form the network of players from a random topology, or load it from TOPOLOGY_FILE if that exists"""
+
+        if self.TOPOLOGY_FILE is not None and os.path.exists(self.TOPOLOGY_FILE):
+            self.topology = topology.Topology.load(self.TOPOLOGY_FILE)
+            if self.topology.n != self.N_PLAYERS:
+                raise ValueError("%s has %s players, expected %s" % (self.TOPOLOGY_FILE, self.topology.n, self.N_PLAYERS))
+        else:
+            self.topology = topology.generate(self.TOPOLOGY, self.N_PLAYERS, self.N_CONNECTIONS, self.context.nprandom,
+                                              self.TOPOLOGY_BETA)
+            if self.TOPOLOGY_FILE is not None:
+                self.topology.save(self.TOPOLOGY_FILE)
 
-        for i in range(len(self.players)):
-            others = self.players[:i]+self.players[i+1:]
-            self.players[i].connections = random.sample(others, self.N_CONNECTIONS)
+        for i in self.players:
+            i.connections = self.topology.neighbors(i.id)
 
     def chooseProposers(self):
-        """Choose proposer for next round; chance of being chosen proportional to stake"""
+        """Choose proposers for next round; chance of being chosen proportional to stake"""
 
-        return random.choice([i.id for i in self.players])
-    
-        """totalStake = self.calcTotalStake()
-        coins = random.sample(list(range(1, int(totalStake+1))), self.N_PROPOSERS) 
-
-        proposers = []
-        
-        startCoins = 0 # coin number right before the start of the current player's set of coins
-        endCoins = 0 # the player's last coin number
-        for i in self.players:
-            endCoins += i.stake
-            for j in coins:
-                if j <= endCoins and j > startCoins:
-                    proposers.append(i)
-            startCoins = endCoins
+        return self.sampler.sampleWithout(self.N_PROPOSERS, self.context.random)
 
-        proposers = [i.id for i in proposers]
+    def chooseValidators(self):
+        """Choose validators for next round; chance of being chosen proportional to stake"""
 
-        # prevent player from being chosen twice
-        if len(proposers) != len(set(proposers)):
-            proposers = self.chooseProposers()
-        
-        return proposers"""
+        return self.sampler.sampleWithout(self.N_VALIDATORS, self.context.random)
 
-    def payout(self, vset, proposer):
-        # validator/proposer rewards
-        for i in vset:
-            i.stake += 1
+    def payout(self, vset, proposer, nBlock=None):
+        """Rewards validators vset and proposer for block nBlock (default: the head of the common blockchain):
+           1 token each plus an equal share of the block's transaction fees"""
 
-        proposer.stake += 1
+        nBlock = self.blockchain if nBlock is None else nBlock
 
-        # tx fee distribution
-        totFee = sum([i.fee for i in self.blockchain.txs])
-        n      = len(vset) + 1
-        for i in vset:
-            i.stake += totFee/n
+        totFee = sum([i.fee for i in nBlock.txs])
+        ids    = [i.id for i in vset] + [proposer.id]
 
-        proposer.stake += totFee/n
+        self.ledger.add(ids, 1 + totFee/len(ids)) # validator/proposer rewards and tx fee distribution
 
     def nextRound(self, heartbeat):
         """Simulates the next round"""
 
+        self.beginHeartbeat(heartbeat)
+
+        if self.shards is not None:
+            self.shards.step(heartbeat)
+        else:
+            for i in self.players:
+                i.action(heartbeat)
+
+        # deliver everything due before the next heartbeat at its exact time
+        if self.events is not None:
+            self.events.runUntil(heartbeat+1)
+
+        self.endHeartbeat()
+
+    def beginHeartbeat(self, heartbeat):
+        """Advances the clock to heartbeat, choosing proposers and validators at the start of a round"""
+
         self.heartbeat = heartbeat
 
-        # if start of round, reset validator, proposer set & update common blockchain
-        if heartbeat % Solver.N_HEARTBEATS_IN_ROUND == 0:
+        # if start of round, update common blockchain & reset validator, proposer set
+        if heartbeat % self.N_HEARTBEATS_IN_ROUND == 0:
+            if self.recordStakes:
+                self.ledger.snapshot()
+
+            # pays the validators of the round that just ended, so it must come before the new sets are drawn
+            self.updateCommonChain() # update common blockchain among players
+
             self.propSet = self.chooseProposers()  # choose proposer set
+            self.valSet  = self.chooseValidators() # choose validator set
+            self.committees[heartbeat // self.N_HEARTBEATS_IN_ROUND] = self.valSet
 
-            # update common blockchain among players
-            currBlock = self.players[0].blockchain
-            same = True
-            for i in self.players:
-                if currBlock != i.blockchain:
-                    same = False
-                    break
+    def endHeartbeat(self):
+        """Records the metrics of the heartbeat that just ended"""
 
-            if same and currBlock != None:
-                currBlock = block.Block(currBlock.txs, id=currBlock.id, proposer=currBlock.proposer)
-                currBlock.next = self.blockchain
-                self.blockchain = currBlock
+        if self.metrics is not None:
+            self.metrics.record(self)
 
-        for i in self.players:
-            i.action(heartbeat)
+        if self.chainlog is not None:
+            self.chainlog.flush()
 
     def simulate(self):
         """Simulate the system"""
         
-        for i in range(self.nHeartbeats):
-            self.nextRound(i)
+        try:
+            for i in range(self.done, self.nHeartbeats):
+                self.nextRound(i)
+                self.done = i+1
 
-        # update common blockchain among players
-        currBlock = self.players[0].blockchain
-        same = True
-        for i in self.players:
-            if currBlock != i.blockchain:
-                same = False
-                break
+                if self.CHECKPOINT_EVERY and self.done % (self.CHECKPOINT_EVERY*self.N_HEARTBEATS_IN_ROUND) == 0:
+                    checkpoint.save(self, self.CHECKPOINT_FILE.format(round=self.done//self.N_HEARTBEATS_IN_ROUND))
+        finally:
+            if self.shards is not None:
+                self.shards.close()
+
+        self.finish()
+
+    def finish(self):
+        """Settles the common blockchain and closes the outputs at the end of a run"""
+
+        self.updateCommonChain() # update common blockchain among players
+
+        if self.recordStakes:
+            self.ledger.snapshot() # final stakes
+
+        if self.metrics is not None:
+            self.metrics.close()
+
+        if self.chainlog is not None:
+            self.chainlog.close()
+
+    def updateCommonChain(self):
+        """If all players agree on their chain, it becomes the common blockchain. Chains live in the shared
+           block store, so the common blockchain is just a reference to the agreed tip, which the finality
+           tracker knows without looking at the players"""
+
+        currBlock = self.finality.agreed()
+        if currBlock is not None and currBlock != self.blockchain:
+            # pay out every block that became common, oldest first
+            height = self.blockchain.height if self.blockchain is not None else -1
+
+            newBlocks = []
+            for i in currBlock.chain():
+                if i.height <= height:
+                    break
+                newBlocks.append(i)
 
-        if same and currBlock != None:
-            currBlock = block.Block(currBlock.txs, id=currBlock.id, proposer=currBlock.proposer)
-            currBlock.next = self.blockchain
             self.blockchain = currBlock
+            for i in reversed(newBlocks):
+                self.payout([self.players[j] for j in self.committee(i)], self.players[i.proposer], i)
+            self.finality.final(reversed(newBlocks), self.heartbeat)
+
+            # blocks that are not tips yet can only be committed from the current round on
+            oldest = self.finality.oldestTipAt()
+            oldest = (oldest if oldest is not None else self.heartbeat) // self.N_HEARTBEATS_IN_ROUND
+            for i in [i for i in self.committees if i < oldest]:
+                del self.committees[i]
+
+            if self.metrics is not None:
+                self.metrics.common(reversed(newBlocks), self.heartbeat)
+            if self.chainlog is not None:
+                self.chainlog.common(reversed(newBlocks), self.heartbeat)
+
+            if self.PRUNE_DEPTH is not None:
+                self.prune(currBlock)
+
+    def committee(self, nBlock):
+        """Returns the ids of the validators of the round nBlock was proposed in. Votes are dropped at the end of
+           every round, so that is the round it was first committed in, i.e. first became a tip"""
+
+        heartbeat = self.finality.firstTipAt(nBlock)
+        if heartbeat is None: # never a tip on its own; it was committed along with the block above it
+            return self.valSet
+
+        return self.committees.get(heartbeat // self.N_HEARTBEATS_IN_ROUND, self.valSet)
+
+    def prune(self, final):
+        """Discards consensus state older than the block final, which all players agree on"""
+
+        for i in self.players:
+            i.consensus.prune(final)
+
+        self.blockStore.prune(final, self.PRUNE_DEPTH)
+        if self.shards is not None:
+            self.shards.prune(final)
+
+    def __getstate__(self):
+        """State pickled into checkpoints. The tracer's sinks hold open files and are left out; stored blocks
+           come first, oldest first, so that pickling a long chain never recurses down the whole chain"""
+
+        state = {"blocks": sorted(self.blockStore.blocks.values(), key=lambda b: b.height)}
+        state.update(self.__dict__)
+        state["tracer"] = None
+
+        return state
+
+    def __setstate__(self, state):
+        del state["blocks"]
+        self.__dict__.update(state)
+
+        self.tracer = tracer.Tracer()
 
     def calcPercentStake(self):
         """Calculates the percent stake for each player"""
         
-        totalStake = self.calcTotalStake()
-        percent = [i.stake/totalStake for i in self.players]
-
-        return percent
+        return self.ledger.percent().tolist()
 
     def calcTotalStake(self):
         """Calculates the total stake among all players"""
 
-        return sum([i.stake for i in self.players])
+        return self.ledger.total
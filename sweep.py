@@ -0,0 +1,110 @@
+"""sweep.py: runs a grid of simulations across a process pool and streams the results into one CSV table
+
+Usage:
+  sweep.py (--help | -h)
+  sweep.py [options] <grid>
+
+Arguments:
+  <grid>                JSON object, or path to a JSON file, mapping option names (see driver.DEFAULTS) to lists
+                        of values, e.g. '{"N_CONNECTIONS": [4, 8], "P_TRANSACTIONS": [0.1, 0.2]}'
+
+Options:
+  --seeds=<seeds>       comma-separated seeds and ranges, e.g. "1,5,10-19" [default: 0-9]
+  --processes=<n>       number of worker processes (default: all cores)
+  --out=<file>          write the table to file instead of stdout
+  --help                show this
+"""
+
+import driver
+import economics
+
+from docopt import docopt
+import csv
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+def expand(grid, seeds, base=None):
+    """Returns the list of opts for every combination of the values in grid and every seed"""
+
+    base  = dict(driver.DEFAULTS if base is None else base)
+    names = sorted(grid)
+
+    optsList = []
+    for values in itertools.product(*[grid[i] for i in names]):
+        for seed in seeds:
+            opts = dict(base)
+            opts.update(zip(names, values))
+            opts["SEED"] = seed
+            optsList.append(opts)
+
+    return optsList
+
+def summarize(sol, seconds):
+    """Returns the result row of one simulation"""
+
+    if isinstance(sol, economics.EconomicsSimulator): # averages over replicas
+        return {"N_PLAYERS":       sol.N_PLAYERS,
+                "COMMON_BLOCKS":   sol.committed.mean(),
+                "STORED_BLOCKS":   None, # economics runs store no blocks
+                "MAX_STAKE_SHARE": sol.calcPercentStake().max(axis=1).mean(),
+                "TOTAL_STAKE":     sol.calcTotalStake().mean(),
+                "SECONDS":         round(seconds, 3)}
+
+    stakes = sol.calcPercentStake()
+
+    return {"N_PLAYERS":       sol.N_PLAYERS,
+            "COMMON_BLOCKS":   sol.blockchain.height+1 if sol.blockchain is not None else 0,
+            "STORED_BLOCKS":   len(sol.blockStore),
+            "MAX_STAKE_SHARE": max(stakes),
+            "TOTAL_STAKE":     sol.calcTotalStake(),
+            "SECONDS":         round(seconds, 3)}
+
+def runOne(opts):
+    """Runs one simulation of the sweep and returns (opts, result row)"""
+
+    start = time.perf_counter()
+    sol   = driver.run(opts)
+
+    return opts, summarize(sol, time.perf_counter()-start)
+
+def sweep(optsList, processes=None):
+    """Runs every opts in optsList in a process pool and yields (opts, result row) as soon as each finishes"""
+
+    with multiprocessing.Pool(processes) as pool:
+        for i in pool.imap_unordered(runOne, optsList):
+            yield i
+
+def parseSeeds(spec):
+    seeds = []
+    for part in spec.split(","):
+        if "-" in part:
+            start, end = part.split("-")
+            seeds.extend(range(int(start), int(end)+1))
+        else:
+            seeds.append(int(part))
+    return seeds
+
+if __name__=="__main__":
+    args = docopt(__doc__)
+
+    spec = args["<grid>"]
+    grid = json.load(open(spec)) if os.path.exists(spec) else json.loads(spec)
+    if "PLAYERS" in grid:
+        grid["PLAYERS"] = [[tuple(j) for j in i] for i in grid["PLAYERS"]]
+
+    optsList  = expand(grid, parseSeeds(args["--seeds"]))
+    processes = int(args["--processes"]) if args["--processes"] else None
+
+    out    = open(args["--out"], "w", newline="") if args["--out"] else sys.stdout
+    writer = None
+    for opts, row in sweep(optsList, processes):
+        row = dict([(i, opts[i]) for i in sorted(grid)] + [("SEED", opts["SEED"])] + list(row.items()))
+        if writer is None:
+            writer = csv.DictWriter(out, fieldnames=list(row))
+            writer.writeheader()
+        writer.writerow(row)
+        out.flush()
@@ -0,0 +1,73 @@
+"""This module defines the VoteTally class, which counts the votes of one round per voted value (e.g. block digest).
+
+For every value, a bitset over player ids (one bit per player, packed eight to a byte) gives O(1) duplicate
+detection, and a running sum of the voters' stake gives O(1) stake-weighted quorum checks, in N/8 bytes per value
+rather than N. clear() drops all values at the start of a round.
+"""
+
+class VoteTally:
+    def __init__(self, ledger):
+        """Creates an empty VoteTally whose votes are weighted by the stakes in ledger (a StakeLedger)"""
+
+        self.ledger = ledger
+        self.n      = len(ledger.stakes)
+
+        self.voters = {} # map of value to bitset, bit i&7 of voters[value][i>>3] is set iff player i voted for value
+        self.stakes = {} # map of value to total stake of its voters
+        self.counts = {} # map of value to number of voters
+
+    def add(self, value, voter):
+        """Records the vote of player voter for value; returns False if it was a duplicate"""
+
+        byte, mask = voter >> 3, 1 << (voter & 7)
+
+        voters = self.voters.get(value)
+        if voters is None:
+            voters = self.voters[value] = bytearray((self.n >> 3) + 1)
+            self.stakes[value] = 0.0
+            self.counts[value] = 0
+        elif voters[byte] & mask:
+            return False
+
+        voters[byte] |= mask
+        self.stakes[value] += self.ledger.stakes[voter]
+        self.counts[value] += 1
+
+        return True
+
+    def hasVoted(self, value, voter):
+        voters = self.voters.get(value)
+        return voters is not None and voters[voter >> 3] & (1 << (voter & 7)) != 0
+
+    def stake(self, value):
+        """Returns the total stake that voted for value"""
+
+        return self.stakes.get(value, 0.0)
+
+    def count(self, value):
+        """Returns the number of players that voted for value"""
+
+        return self.counts.get(value, 0)
+
+    def hasQuorum(self, value, fraction=2/3):
+        """Returns whether players holding at least fraction of the total stake voted for value"""
+
+        return self.stakes.get(value, 0.0) >= fraction*self.ledger.total
+
+    def clear(self):
+        """Drops all votes, e.g. at the start of a new round"""
+
+        self.voters.clear()
+        self.stakes.clear()
+        self.counts.clear()
+
+    def __contains__(self, value):
+        return value in self.voters
+
+    def __len__(self):
+        return len(self.voters)
+
+    def __repr__(self):
+        values = ["%s: %s votes, stake %s" % (i.hex()[:14] if isinstance(i, bytes) else i, self.counts[i], round(self.stakes[i], 2))
+                  for i in self.voters]
+        return "{" + ", ".join(values) + "}"
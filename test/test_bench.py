@@ -0,0 +1,17 @@
+import os,sys,inspect
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0,parentdir)
+
+import bench
+
+def test_compare():
+    def results(hbs, rss):
+        return {"results": [{"params": {"N_CONNECTIONS": 4},
+                             "metrics": {"HEARTBEATS_PER_SEC": hbs, "MESSAGES_PER_SEC": 100,
+                                         "SECONDS_PER_BLOCK": None, "PEAK_RSS_MB": rss}}]}
+
+    assert bench.compare(results(100, 50), results(95, 52), 0.1) == []
+
+    regressions = bench.compare(results(100, 50), results(80, 60), 0.1)
+    assert [i[1] for i in regressions] == ["HEARTBEATS_PER_SEC", "PEAK_RSS_MB"]
@@ -35,3 +35,13 @@ def test_blockEquals():
     assert a != c
     assert b != c
 
+
+def test_chainDigest():
+    t = [transaction.Transaction(i, i+1, 0) for i in range(6)]
+
+    a = block.Block(t[:3])
+    b = block.Block([t[2], t[1], t[0]])
+
+    assert block.Block(t[3:], next=a) == block.Block(t[3:], next=b)
+    assert block.Block(t[3:], next=a) != block.Block(t[3:])
+    assert block.Block(t[3:], next=a).rebase(None) == block.Block(t[3:])
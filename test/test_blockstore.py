@@ -0,0 +1,28 @@
+import os,sys,inspect
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0,parentdir)
+
+import blockstore
+import transaction
+
+def test_sharedBlocks():
+    store = blockstore.BlockStore()
+    t = [transaction.Transaction(i, i+1, 0) for i in range(6)]
+
+    a = store.extend(t[:3], None)
+    b = store.extend(t[3:], None)
+
+    assert store.rebase(b, a) is store.rebase(b, a)
+    assert store.rebase(b, a).next is a
+    assert len(store) == 3
+
+def test_longChain():
+    store = blockstore.BlockStore()
+
+    tip = None
+    for i in range(5000):
+        tip = store.extend([], tip)
+
+    assert tip.height == 4999
+    assert len(str(tip).split("\n")) == 5000
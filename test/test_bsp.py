@@ -0,0 +1,23 @@
+import os,sys,inspect
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0,parentdir)
+
+import driver
+
+import pytest
+
+opts = dict(driver.DEFAULTS, PLAYERS=[(30, 1)], N_CONNECTIONS=8, N_HEARTBEATS_IN_ROUND=10, N_ROUNDS=4, SEED=3,
+            ENGINE="bsp")
+
+def test_shardCountIndependence():
+    runs = [driver.run(dict(opts, SHARDS=n)) for n in (1, 3)]
+
+    assert runs[0].blockchain is not None
+    assert [i.blockchain.digest for i in runs[0].players] == [i.blockchain.digest for i in runs[1].players]
+    assert (runs[0].ledger.stakes == runs[1].ledger.stakes).all()
+    assert runs[0].gossip.sent == runs[1].gossip.sent
+
+def test_shardsNeedOneProcess():
+    with pytest.raises(ValueError):
+        driver.run(dict(opts, SHARDS=2, TRACE_LEVEL="info"))
@@ -0,0 +1,32 @@
+import os,sys,inspect
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0,parentdir)
+
+import chainlog
+import driver
+
+opts = dict(driver.DEFAULTS, PLAYERS=[(20, 1)], N_ROUNDS=4, SEED=3)
+
+def test_formatsAgree(tmp_path):
+    records = []
+    for format in chainlog.FORMATS:
+        path = str(tmp_path / ("chain." + format))
+        sol  = driver.run(dict(opts, CHAIN_FILE=path, CHAIN_FORMAT=format))
+        records.append(list(chainlog.readRecords(path)))
+
+    assert records[0] == records[1]
+
+    common = [i for i in records[0] if i["event"] == "common"]
+    assert [i["digest"] for i in common] == [i.digest.hex() for i in reversed(list(sol.blockchain.chain()))]
+    assert [len(i["txs"]) for i in common] == [len(i.txs) for i in reversed(list(sol.blockchain.chain()))]
+    assert sum(1 for i in records[0] if i["event"] == "commit") >= len(common)*20
+
+def test_resumeAppends(tmp_path):
+    path, snapshot = str(tmp_path / "chain.jsonl"), str(tmp_path / "snapshot.pkl.gz")
+
+    full = list(chainlog.readRecords(driver.run(dict(opts, CHAIN_FILE=path)).chainlog.path))
+    driver.run(dict(opts, N_ROUNDS=2, CHECKPOINT_EVERY=2, CHECKPOINT_FILE=snapshot, CHAIN_FILE=path))
+    driver.run(dict(opts, RESUME=snapshot, CHAIN_FILE=path))
+
+    assert list(chainlog.readRecords(path)) == full
@@ -0,0 +1,30 @@
+import os,sys,inspect
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0,parentdir)
+
+import checkpoint
+import driver
+
+def test_resumeIsExact(tmp_path):
+    path = str(tmp_path / "snapshot.pkl.gz")
+    opts = dict(driver.DEFAULTS, PLAYERS=[(20, 1)], N_CONNECTIONS=4, N_ROUNDS=8, SEED=3)
+
+    full = driver.run(dict(opts, CHECKPOINT_EVERY=4, CHECKPOINT_FILE=path)) # the last snapshot is at round 8
+    half = driver.run(dict(opts, N_ROUNDS=4, CHECKPOINT_EVERY=4, CHECKPOINT_FILE=path))
+    rest = driver.run(dict(opts, RESUME=path))
+
+    assert half.done == 20 and rest.done == 40
+    assert [i.blockchain for i in rest.players] == [i.blockchain for i in full.players]
+    assert (rest.ledger.stakes == full.ledger.stakes).all()
+    assert rest.context.random.random() == full.context.random.random()
+
+def test_apply(tmp_path):
+    path = str(tmp_path / "snapshot.pkl.gz")
+    driver.run(dict(driver.DEFAULTS, PLAYERS=[(20, 1)], N_CONNECTIONS=4, N_ROUNDS=2, CHECKPOINT_EVERY=2, CHECKPOINT_FILE=path))
+
+    a, b = checkpoint.load(path), checkpoint.load(path)
+    checkpoint.apply(b, {"SEED": 5, "STAKES": {"0": 10}, "N_ROUNDS": 6})
+
+    assert b.players[0].stake == 10 and b.nHeartbeats == 30
+    assert a.context.random.random() != b.context.random.random()
@@ -0,0 +1,49 @@
+import os,sys,inspect
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0,parentdir)
+
+import consensus
+import driver
+import pbftconsensus
+import solver
+
+import pytest
+
+def test_registry():
+    assert isinstance(consensus.make("pbft", 3), pbftconsensus.PBFTConsensus)
+    assert consensus.make("pbft", 3).id == 3
+
+    with pytest.raises(ValueError):
+        consensus.make("proof-of-work", 0)
+
+def test_batchAgreesWithSerial():
+    # tight rounds: votes stamped later than the message that caused them miss the end of the round
+    for seed in range(1, 6):
+        opts = dict(driver.DEFAULTS, PLAYERS=[(30, 1)], N_HEARTBEATS_IN_ROUND=4, N_ROUNDS=8, SEED=seed)
+        runs = [driver.run(dict(opts, CONSENSUS=i)) for i in ("pbft-serial", "pbft")]
+        tips = [set(i.blockchain for i in run.players) for run in runs]
+
+        assert [i.txs for i in runs[0].blockchain.chain()] == [i.txs for i in runs[1].blockchain.chain()]
+        assert tips[0] == tips[1]
+        if seed < 5:
+            assert runs[1].blockchain.height == 7 and len(tips[1]) == 1
+
+def test_emptyBlockProposedAgain():
+    # slow gossip makes rounds fail, after which the next proposer proposes the same empty block again
+    sol = solver.Solver(dict(driver.DEFAULTS, PLAYERS=[(20, 1)], MEAN_PROP_TIME=3.0, P_TRANSACTIONS=0, N_ROUNDS=10, SEED=1))
+
+    proposed = []
+    def recordProposals(proposeBlock):
+        def proposeAndRecord():
+            proposed.append(proposeBlock())
+            return proposed[-1]
+        return proposeAndRecord
+    for i in sol.players:
+        i.consensus.proposeBlock = recordProposals(i.consensus.proposeBlock)
+
+    sol.simulate()
+
+    again = [b for a, b in zip(proposed, proposed[1:]) if b is a] # same digest, proposed in the next round
+    assert again and not again[0].txs
+    assert sol.blockchain is not None and again[0] in sol.blockchain.chain() # the players agreed on it in the end
@@ -0,0 +1,28 @@
+import os,sys,inspect
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0,parentdir)
+
+import driver
+import economics
+
+import numpy as np
+import pytest
+
+def test_stakeConservation():
+    opts = dict(driver.DEFAULTS, PLAYERS=[(5, 0), (10, 1), (5, 3)], N_ROUNDS=500, N_REPLICAS=4, P_COMMIT=0.7, SEED=1)
+
+    for chunk in [1, 50]:
+        sim = economics.EconomicsSimulator(dict(opts, ECON_CHUNK=chunk))
+        sim.simulate()
+
+        rewards = sim.committed*(opts["N_VALIDATORS"]+1) + sim.fees
+        assert np.allclose(sim.calcTotalStake(), 25 + rewards)
+        assert (sim.stakes[:, :5] == 0).all() # players without stake are never drawn
+        assert 300 < sim.committed.mean() < 400
+
+def test_tooFewStakeholders():
+    sim = economics.EconomicsSimulator(dict(driver.DEFAULTS, PLAYERS=[(5, 0), (4, 1)], N_ROUNDS=10, SEED=1))
+
+    with pytest.raises(ValueError): # 4 players with stake cannot fill 5 validator seats
+        sim.simulate()
@@ -0,0 +1,43 @@
+import os,sys,inspect
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0,parentdir)
+
+import block
+import driver
+import finality
+import player
+import transaction
+
+def test_tips():
+    players = [player.Player(1, i) for i in range(3)]
+    tracker = finality.FinalityTracker(players)
+    for i in players:
+        i.finality = tracker
+        i.solver   = type("Solver", (), {"heartbeat": 2})
+
+    a = block.Block([])
+    b = block.Block([transaction.Transaction(0, 1, 0.1, 1)], next=a)
+    c = block.Block([transaction.Transaction(0, 1, 0.1, 2)], next=a) # competes with b for height 1
+
+    assert tracker.agreed() is None and tracker.count(None) == 3
+
+    for i in players:
+        i.blockchain = a
+    assert tracker.agreed() is a and tracker.count(a) == 3
+
+    players[0].blockchain = b
+    players[1].blockchain = c
+    assert tracker.agreed() is None
+    assert tracker.count(a) == 1 and tracker.count(b) == 1 and tracker.count(c) == 1
+    assert tracker.forks() == {1: [b, c]}
+
+    tracker.final([a], 5)
+    assert tracker.latencies == [(0, 3)]
+
+def test_matchesPlayers():
+    sol = driver.run(dict(driver.DEFAULTS, PLAYERS=[(20, 1)], N_HEARTBEATS_IN_ROUND=10, N_ROUNDS=3, SEED=3))
+
+    assert sol.finality.agreed() is sol.blockchain
+    assert len(sol.finality.latencies) == sol.blockchain.height+1
+    assert sum(sol.finality.count(i) for i in sol.finality.tips()) == 20
@@ -0,0 +1,45 @@
+import os,sys,inspect
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0,parentdir)
+
+import gossip
+
+def test_seenFilterIsBounded():
+    f = gossip.SeenFilter(4)
+
+    assert all(f.add(i) for i in range(6))
+    assert not f.add(5) and not f.add(0)
+    assert len(f) <= 8
+
+    for i in range(6, 14):
+        f.add(i)
+    assert 0 not in f and 13 in f
+
+def test_earliestCopyWins():
+    import driver
+    import message
+    import solver
+
+    for engine in ("heartbeat", "event", "continuous"):
+        sol = solver.Solver(dict(driver.DEFAULTS, PLAYERS=[(10, 1)], P_TRANSACTIONS=0, ENGINE=engine, SEED=1))
+        p   = sol.players[0]
+        msg = message.Message(message.Message.MessageType.VOTE, b"x", 1, sol.context.newId("message"))
+
+        received = []
+        p.receive = lambda batch: received.extend(batch)
+
+        # the copy queued second arrives first, so it replaces the one queued before it
+        p.deliver([msg], [4.5], 1)
+        p.deliver([msg], [2.5], 2)
+        p.deliver([msg], [3.5], 3)
+
+        for h in range(1, 7):
+            sol.heartbeat = h
+            if engine == "continuous":
+                sol.events.runUntil(h)
+            else:
+                p.action(h)
+
+        assert [tuple(i) for i in received] == [(msg, 2.5)]
+        assert sol.gossip.redundant == sol.gossip.dropped == 2 and not p.pending
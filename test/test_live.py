@@ -0,0 +1,24 @@
+import os,sys,inspect
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0,parentdir)
+
+import driver
+
+import pytest
+
+opts = dict(driver.DEFAULTS, MODE="live", PLAYERS=[(20, 1)], N_HEARTBEATS_IN_ROUND=10, N_ROUNDS=2,
+            LIVE_HEARTBEAT=0.02, SEED=3)
+
+@pytest.mark.parametrize("transport", ["queue", "tcp"])
+def test_transports(transport):
+    emu = driver.run(dict(opts, LIVE_TRANSPORT=transport))
+
+    assert emu.sol.blockchain is not None
+    assert len(emu.latencies) == len(emu.lateness) > 0
+    assert len(emu.lags) == emu.sol.nHeartbeats+1
+    assert "blocks/s" in emu.report()
+
+def test_unknownTransport():
+    with pytest.raises(ValueError):
+        driver.run(dict(opts, LIVE_TRANSPORT="carrier-pigeon"))
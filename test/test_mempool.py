@@ -0,0 +1,40 @@
+import os,sys,inspect
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0,parentdir)
+
+import mempool
+import transaction
+
+import random
+
+def test_selectByFee():
+    txs  = [transaction.Transaction(0, 0, fee, i) for i, fee in enumerate([3, 1, 4, 1.5, 9, 2.6])]
+    pool = mempool.Mempool()
+    for tx in txs:
+        pool.add(tx)
+
+    assert [tx.fee for tx in pool.select(3, None)] == [9, 4, 3]
+    pool.remove(txs[4])
+    assert [tx.fee for tx in pool.select(3, None)] == [4, 3, 2.6]
+    assert len(pool) == 5 and txs[4] not in pool
+
+def test_capacityEvictsLowestFee():
+    pool = mempool.Mempool(capacity=3)
+    txs  = [transaction.Transaction(0, 0, fee, i) for i, fee in enumerate([5, 1, 7, 3])]
+    for tx in txs:
+        pool.add(tx)
+
+    assert len(pool) == 3 and txs[1] not in pool and pool.evicted == 1
+    assert not pool.add(transaction.Transaction(0, 0, 0.5, 4)) # lower than everything in the pool
+
+def test_randomPolicy():
+    pool = mempool.Mempool(policy="random")
+    txs  = [transaction.Transaction(0, 0, 1, i) for i in range(20)]
+    for tx in txs:
+        pool.add(tx)
+    for tx in txs[::2]:
+        pool.remove(tx)
+
+    chosen = pool.select(5, random.Random(0))
+    assert len(chosen) == 5 and all(tx.id % 2 == 1 for tx in chosen)
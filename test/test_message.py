@@ -0,0 +1,22 @@
+import os,sys,inspect
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0,parentdir)
+
+import context
+import driver
+import message
+
+def test_compact():
+    ctx = context.Context(0)
+    msg = message.Message(message.Message.MessageType.VOTE, bytes(32), 0, ctx.newId("message"))
+
+    assert not hasattr(msg, "__dict__")
+    assert message.Message(message.Message.MessageType.VOTE, None, 0, ctx.newId("message")).id == msg.id + 1
+
+def test_blocksByDigest():
+    sol = driver.run(dict(driver.DEFAULTS, PLAYERS=[(20, 1)], N_ROUNDS=2, SEED=3))
+
+    for i in sol.players:
+        for digest, nBlock in i.consensus.seenBlocks.items():
+            assert sol.blockStore.get(digest) is nBlock
@@ -0,0 +1,42 @@
+import os,sys,inspect
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0,parentdir)
+
+import checkpoint
+import driver
+import metrics
+
+def test_tables(tmp_path):
+    for format in ("npz", "csv"):
+        path = str(tmp_path / format)
+        sol  = driver.run(dict(driver.DEFAULTS, PLAYERS=[(20, 1)], N_CONNECTIONS=4, N_ROUNDS=6,
+                               METRICS_FILE=path, METRICS_FORMAT=format, METRICS_CHUNK=7))
+
+        heartbeats = metrics.readTable(path, "heartbeats", format)
+        blocks     = metrics.readTable(path, "blocks", format)
+
+        assert list(heartbeats["heartbeat"]) == list(range(sol.nHeartbeats))
+        assert sum(heartbeats["sent_" + i].sum() for i in metrics.TYPES) == sol.gossip.sent
+        assert len(blocks["block"]) == sol.blockchain.height+1
+        assert (blocks["proposed"] <= blocks["first_commit"]).all() and (blocks["first_commit"] <= blocks["common"]).all()
+
+def test_resumeAndFork(tmp_path):
+    snapshot = str(tmp_path / "snapshot.pkl.gz")
+    opts     = dict(driver.DEFAULTS, PLAYERS=[(20, 1)], N_CONNECTIONS=4, N_ROUNDS=8, SEED=3, METRICS_CHUNK=7)
+
+    for format in ("npz", "csv"):
+        full, path = str(tmp_path / ("full." + format)), str(tmp_path / ("resumed." + format))
+        driver.run(dict(opts, METRICS_FILE=full, METRICS_FORMAT=format))
+
+        # the first run writes two rounds past its last snapshot, which the resumed run must drop
+        driver.run(dict(opts, N_ROUNDS=6, CHECKPOINT_EVERY=4, CHECKPOINT_FILE=snapshot, METRICS_FILE=path, METRICS_FORMAT=format))
+        driver.run(dict(opts, RESUME=snapshot, METRICS_FILE=path, METRICS_FORMAT=format))
+
+        for table in ("heartbeats", "blocks"):
+            a, b = metrics.readTable(full, table, format), metrics.readTable(path, table, format)
+            assert a.keys() == b.keys() and all((a[i] == b[i]).all() for i in a)
+
+        files = dict((i, open(str(tmp_path / i), "rb").read()) for i in os.listdir(str(tmp_path)) if i.startswith("resumed."))
+        checkpoint.forkOne((snapshot, {"SEED": 1}))
+        assert files == dict((i, open(str(tmp_path / i), "rb").read()) for i in os.listdir(str(tmp_path)) if i.startswith("resumed."))
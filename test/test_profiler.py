@@ -0,0 +1,21 @@
+import os,sys,inspect
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0,parentdir)
+
+import driver
+import player
+import profiler
+import solver
+
+def test_phaseTimers(tmp_path):
+    original = player.Player.sendOutbound
+    sol      = solver.Solver(dict(driver.DEFAULTS, PLAYERS=[(20, 1)], N_CONNECTIONS=4, N_ROUNDS=2))
+
+    with profiler.Profiler(str(tmp_path / "run.prof")) as prof:
+        sol.simulate()
+
+    assert player.Player.sendOutbound is original # timers are removed again
+    assert prof.calls["roundInit"] == 20*10 and prof.calls["processBatch"] > 0
+    assert sum(prof.seconds.values()) <= prof.total
+    assert os.path.exists(str(tmp_path / "run.prof"))
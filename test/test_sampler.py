@@ -0,0 +1,30 @@
+import os,sys,inspect
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0,parentdir)
+
+import sampler
+
+import random
+
+def test_find():
+    s = sampler.StakeSampler([1, 0, 2.5, 0.5])
+
+    assert [s.find(u) for u in [0, 0.99, 1, 3.49, 3.5, 3.99]] == [0, 0, 2, 2, 3, 3]
+
+    s.update(1, 2)
+    assert s.total == 6
+    assert [s.find(u) for u in [1, 2.99, 3]] == [1, 1, 2]
+
+def test_sampleWithout():
+    s   = sampler.StakeSampler([0, 1, 0, 3, 2, 0])
+    rng = random.Random(0)
+
+    for i in range(20):
+        assert sorted(s.sampleWithout(3, rng)) == [1, 3, 4]
+    assert s.weights == [0, 1, 0, 3, 2, 0]
+
+    counts = [0]*6
+    for i in range(6000):
+        counts[s.sample(rng)] += 1
+    assert 2500 < counts[3] < 3500
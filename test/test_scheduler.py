@@ -0,0 +1,24 @@
+import os,sys,inspect
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0,parentdir)
+
+import scheduler
+
+def test_heapInboxPopDue():
+    inbox = scheduler.HeapInbox()
+    for msg, timestamp in [("c", 2.5), ("a", 0.3), ("b", 1.0), ("d", 1.0)]:
+        inbox.push(msg, timestamp)
+
+    assert list(inbox.popDue(1)) == [("a", 0.3), ("b", 1.0), ("d", 1.0)]
+    assert len(inbox) == 1
+    assert list(inbox.popDue(2)) == []
+    assert list(inbox.popDue(3)) == [("c", 2.5)]
+
+def test_listInboxPopDue():
+    inbox = scheduler.ListInbox()
+    for msg, timestamp in [("c", 2.5), ("a", 0.3), ("b", 1.0)]:
+        inbox.push(msg, timestamp)
+
+    assert inbox.popDue(1) == [["a", 0.3], ["b", 1.0]]
+    assert len(inbox) == 1
@@ -36,3 +36,126 @@ def test_calcPercentStake():
 
     assert s.calcPercentStake() == [0, 1/45, 2/45, 3/45, 4/45,
                                     5/45, 6/45, 7/45, 8/45, 9/45]
+
+def test_isolatedRuns():
+    import driver
+
+    runOpts = dict(driver.DEFAULTS, PLAYERS=[(20, 1)], N_CONNECTIONS=4, SEED=7)
+
+    a = driver.run(runOpts)
+    driver.run(dict(runOpts, SEED=8)) # interleaved run must not disturb ids or random state
+    b = driver.run(runOpts)
+
+    assert [i.blockchain for i in a.players] == [i.blockchain for i in b.players]
+    assert a.context.newId("message") == b.context.newId("message")
+
+def test_payout():
+    t = transaction.Transaction(0, 1, 0.3)
+
+    opts["PLAYERS"] = [(10, 1)]
+    s = solver.Solver(opts)
+    s.payout([s.players[0], s.players[1]], s.players[1], block.Block([t]))
+
+    assert s.players[1].stake == 1 + 2*1.1
+    assert s.calcTotalStake() == 10 + 3*1.1
+    assert s.sampler.weights == list(s.ledger.stakes)
+
+def test_prune():
+    import driver
+    import memory
+
+    runOpts = dict(driver.DEFAULTS, PLAYERS=[(20, 1)], N_CONNECTIONS=4, N_ROUNDS=10, SEED=7)
+
+    full   = driver.run(runOpts)
+    pruned = driver.run(dict(runOpts, PRUNE_DEPTH=1))
+    final  = pruned.blockchain
+
+    assert final == full.blockchain and final.height > 2
+    assert len(list(final.chain())) == 2
+    assert all(b.height > final.height for i in pruned.players for b in i.consensus.seenBlocks.values())
+
+    size = dict(memory.report(pruned))
+    assert size["blockStore"] < dict(memory.report(full))["blockStore"]
+
+def test_payoutValidatorsOfTheRound():
+    import driver
+
+    sol = solver.Solver(dict(driver.DEFAULTS, PLAYERS=[(30, 1)], N_HEARTBEATS_IN_ROUND=10, N_ROUNDS=4, SEED=3))
+
+    valSets, paid = [], {}
+    chooseValidators, payout = sol.chooseValidators, sol.payout
+    def recordValidators():
+        valSets.append(chooseValidators())
+        return valSets[-1]
+    def recordPayout(vset, proposer, nBlock=None):
+        paid[nBlock.height] = [i.id for i in vset]
+        payout(vset, proposer, nBlock)
+    sol.chooseValidators, sol.payout = recordValidators, recordPayout
+
+    sol.simulate()
+
+    # every round commits one block, which is paid to the validators of the round it was proposed in
+    assert sol.blockchain.height == 3
+    assert paid == dict((h, valSets[h]) for h in range(4))
+
+def test_sameSeedSameRun():
+    import driver
+
+    runOpts = dict(driver.DEFAULTS, PLAYERS=[(20, 1)], N_CONNECTIONS=8, N_ROUNDS=6, SEED=11)
+
+    a, b = driver.run(runOpts), driver.run(runOpts)
+
+    assert [list(i.blockchain.chain()) if i.blockchain is not None else [] for i in a.players] == \
+           [list(i.blockchain.chain()) if i.blockchain is not None else [] for i in b.players]
+    assert a.blockchain is not None and a.blockchain.height > 0
+    assert vars(a.gossip) == vars(b.gossip) and a.gossip.sent > 0
+    assert (a.ledger.stakes == b.ledger.stakes).all()
+
+def test_batchedPropagationDelays():
+    import driver
+    import message
+    import numpy as np
+
+    sol = solver.Solver(dict(driver.DEFAULTS, PLAYERS=[(20, 1)], N_CONNECTIONS=8, SEED=5))
+    sol.outbox = [] # collect the fan-out instead of delivering it
+    p = sol.players[0]
+
+    msgs = [message.Message(message.Message.MessageType.TRANSACTION, i, p.id, sol.context.newId("message")) for i in range(2000)]
+    p.outbound = [(msg, 3.0) for msg in msgs]
+
+    rng = np.random.RandomState()
+    rng.set_state(p.context.nprandom.get_state())
+    p.sendOutbound()
+
+    # one row of delays per connection, drawn in the order one draw per edge would take
+    assert [i[1] for i in sol.outbox] == p.connections.tolist()
+    dts = np.array([i[3] for i in sol.outbox]) - 3.0
+    assert dts.shape == (len(p.connections), len(msgs))
+    assert np.allclose(dts, [rng.exponential(sol.MEAN_PROP_TIME, len(msgs)) for i in p.connections])
+    assert abs(dts.mean() - sol.MEAN_PROP_TIME) < 0.05*sol.MEAN_PROP_TIME
+    assert not p.outbound
+
+def test_payoutValidatorsOfALateBlock():
+    import driver
+
+    # slow gossip: a block committed in round 2 only becomes common at the start of round 4
+    sol = solver.Solver(dict(driver.DEFAULTS, PLAYERS=[(30, 1)], MEAN_PROP_TIME=2.0, N_ROUNDS=10, SEED=1))
+
+    valSets, firstTip, paid = [], {}, {}
+    chooseValidators, move, payout = sol.chooseValidators, sol.finality.move, sol.payout
+    def recordValidators():
+        valSets.append(chooseValidators())
+        return valSets[-1]
+    def recordTips(id, old, new, heartbeat):
+        if new is not None:
+            firstTip.setdefault(new.digest, heartbeat // sol.N_HEARTBEATS_IN_ROUND)
+        move(id, old, new, heartbeat)
+    def recordPayout(vset, proposer, nBlock=None):
+        paid[nBlock.digest] = ([i.id for i in vset], sol.heartbeat // sol.N_HEARTBEATS_IN_ROUND)
+        payout(vset, proposer, nBlock)
+    sol.chooseValidators, sol.finality.move, sol.payout = recordValidators, recordTips, recordPayout
+
+    sol.simulate()
+
+    assert any(r > firstTip[d]+1 for d, (vset, r) in paid.items())
+    assert all(vset == valSets[firstTip[d]] for d, (vset, r) in paid.items())
@@ -0,0 +1,33 @@
+import os,sys,inspect
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0,parentdir)
+
+import ledger
+import tally
+
+def test_stakeWeightedQuorum():
+    t = tally.VoteTally(ledger.StakeLedger([1, 1, 1, 6]))
+
+    assert t.add(b"a", 0)
+    assert t.add(b"a", 1)
+    assert not t.add(b"a", 1)
+    assert t.count(b"a") == 2 and t.stake(b"a") == 2
+    assert not t.hasQuorum(b"a")
+
+    t.add(b"b", 3)
+    assert t.hasQuorum(b"b")
+
+    t.clear()
+    assert b"b" not in t and t.stake(b"b") == 0
+
+def test_bitset():
+    t = tally.VoteTally(ledger.StakeLedger([1]*20))
+
+    for i in (0, 7, 8, 19):
+        assert t.add(b"a", i)
+    assert not t.add(b"a", 8)
+
+    assert [i for i in range(20) if t.hasVoted(b"a", i)] == [0, 7, 8, 19]
+    assert not t.hasVoted(b"b", 0)
+    assert len(t.voters[b"a"]) == 3 and t.count(b"a") == 4
@@ -0,0 +1,34 @@
+import os,sys,inspect
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0,parentdir)
+
+import topology
+
+import numpy as np
+
+def test_randomOut():
+    t = topology.randomOut(200, 8, np.random.RandomState(0))
+
+    assert (t.degrees() == 8).all()
+    for i in range(t.n):
+        nbrs = t.neighbors(i)
+        assert i not in nbrs and len(set(nbrs.tolist())) == 8
+
+def test_undirectedAreSimpleAndSymmetric():
+    for name in topology.TOPOLOGIES[1:]:
+        t     = topology.generate(name, 300, 6, np.random.RandomState(1))
+        edges = {(i, j) for i in range(t.n) for j in t.neighbors(i).tolist()}
+
+        assert all(i != j and (j, i) in edges for i, j in edges)
+        assert len(edges) == len(t.indices)
+
+    assert (topology.randomRegular(300, 6, np.random.RandomState(2)).degrees() == 6).all()
+
+def test_saveLoad(tmp_path):
+    t    = topology.smallWorld(50, 4, 0.2, np.random.RandomState(3))
+    path = str(tmp_path / "topology.npz")
+    t.save(path)
+    u = topology.Topology.load(path)
+
+    assert (t.indptr == u.indptr).all() and (t.indices == u.indices).all()
@@ -0,0 +1,25 @@
+import os,sys,inspect
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0,parentdir)
+
+import message
+import tracer
+import transaction
+
+def test_binaryRoundTrip(tmp_path):
+    tx  = transaction.Transaction(0, 1, 0.25)
+    msg = message.Message(message.Message.MessageType.TRANSACTION, tx, 0, 0)
+
+    t = tracer.Tracer(tracer.Level.TRACE)
+    t.sinks.append(tracer.BinarySink(str(tmp_path / "trace.bin")))
+    t.emit(tracer.Event.SEND, 3, 0, 1, msg=msg)
+    t.close()
+
+    lines = [tracer.formatRecord(i) for i in tracer.readRecords(str(tmp_path / "trace.bin"))]
+    assert lines == ["sent %s to player 1" % msg]
+
+def test_levelsAndFilters():
+    assert tracer.Tracer(tracer.Level.OFF).mask == 0
+    assert not tracer.Tracer(tracer.Level.INFO).mask & tracer.Event.SEND
+    assert tracer.Tracer(tracer.Level.TRACE, {"send"}).mask == tracer.Event.SEND
@@ -0,0 +1,29 @@
+import os,sys,inspect
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0,parentdir)
+
+import txgen
+
+def draws(gen, order, heartbeats):
+    return dict(((i, h), gen.get(i, h, 0.5)) for h in heartbeats for i in order)
+
+def test_orderIndependence():
+    a = draws(txgen.TransactionGenerator(7, 50, 0.2, 0.05), range(50), range(10))
+    b = draws(txgen.TransactionGenerator(7, 50, 0.2, 0.05), list(reversed(range(50))), list(reversed(range(10))))
+
+    assert a.keys() == b.keys()
+    for key in a:
+        if a[key] is None:
+            assert b[key] is None
+        else:
+            assert (a[key].id, a[key].recipId, a[key].fee) == (b[key].id, b[key].recipId, b[key].fee)
+
+def test_distribution():
+    gen = txgen.TransactionGenerator(7, 100, 0.2, 0.05)
+    txs = [tx for tx in draws(gen, range(100), range(100)).values() if tx is not None]
+
+    assert abs(len(txs)/10000 - 0.5) < 0.02
+    assert abs(sum(tx.fee for tx in txs)/len(txs) - 0.2) < 0.005
+    assert all(tx.recipId != tx.senderId and 0 <= tx.recipId < 100 for tx in txs)
+    assert len(set(tx.id for tx in txs)) == len(txs)
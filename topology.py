@@ -0,0 +1,190 @@
+"""This module defines the Topology class, which stores the network of players as CSR index arrays, and
+vectorized generators for common random graphs.
+
+The neighbors of player i are indices[indptr[i]:indptr[i+1]]. Generators take a numpy RandomState and return
+a Topology; undirected graphs store every edge in both directions. Topologies can be saved to and loaded from
+.npz files so repeated runs skip generation.
+"""
+
+import numpy as np
+
+class Topology:
+    def __init__(self, indptr, indices):
+        """Creates a Topology from CSR arrays indptr (length n+1) and indices"""
+
+        self.indptr  = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int64)
+
+        self.n = len(self.indptr) - 1
+
+    @staticmethod
+    def fromEdges(n, src, dst):
+        """Creates a Topology with the directed edges src[i] -> dst[i]"""
+
+        src   = np.asarray(src, dtype=np.int64)
+        order = np.argsort(src, kind="stable")
+
+        indptr = np.zeros(n+1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+
+        return Topology(indptr, np.asarray(dst, dtype=np.int64)[order])
+
+    @staticmethod
+    def fromUndirected(n, a, b):
+        """Creates a Topology with the undirected edges a[i] - b[i]"""
+
+        return Topology.fromEdges(n, np.concatenate([a, b]), np.concatenate([b, a]))
+
+    def neighbors(self, i):
+        return self.indices[self.indptr[i]:self.indptr[i+1]]
+
+    def degrees(self):
+        return np.diff(self.indptr)
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            np.savez(f, indptr=self.indptr, indices=self.indices)
+
+    @staticmethod
+    def load(path):
+        data = np.load(path)
+        return Topology(data["indptr"], data["indices"])
+
+def randomOut(n, k, rng):
+    """Every player connects to k distinct other players chosen uniformly at random (directed)"""
+
+    if k > n-1:
+        raise ValueError("cannot connect %s players to %s others each" % (n, k))
+
+    rows = np.arange(n)
+    if 2*k > n: # dense: take the k smallest of random keys per row
+        keys = rng.random_sample((n, n))
+        keys[rows, rows] = np.inf
+        dst  = np.argpartition(keys, k-1, axis=1)[:, :k]
+        return Topology.fromEdges(n, np.repeat(rows, k), dst.ravel())
+
+    # sparse: draw with replacement among the n-1 others and redraw the rows that contain duplicates
+    dst = rng.randint(0, n-1, size=(n, k))
+    dst += dst >= rows[:, None]
+    bad = rows
+    while len(bad):
+        s   = np.sort(dst[bad], axis=1)
+        bad = bad[(s[:, 1:] == s[:, :-1]).any(axis=1)]
+        redraw = rng.randint(0, n-1, size=(len(bad), k))
+        dst[bad] = redraw + (redraw >= bad[:, None])
+
+    return Topology.fromEdges(n, np.repeat(rows, k), dst.ravel())
+
+def uniquePairs(a, b, n):
+    """Returns the undirected pairs (a, b) without self loops and duplicates, as (min, max)"""
+
+    lo, hi = np.minimum(a, b), np.maximum(a, b)
+    keys   = np.unique((lo*n + hi)[lo != hi])
+
+    return keys // n, keys % n
+
+def randomRegular(n, k, rng, maxTries=100):
+    """Undirected random k-regular graph from the configuration model; stubs of self loops and repeated edges
+       are re-paired with random other pairs until the graph is simple"""
+
+    if n*k % 2 or k > n-1:
+        raise ValueError("no %s-regular graph on %s players" % (k, n))
+
+    stubs = np.repeat(np.arange(n, dtype=np.int64), k)
+    rng.shuffle(stubs)
+    pairs = stubs.reshape(-1, 2)
+
+    for i in range(maxTries):
+        lo, hi = np.minimum(pairs[:, 0], pairs[:, 1]), np.maximum(pairs[:, 0], pairs[:, 1])
+        keys   = lo*n + hi
+        first  = np.zeros(len(keys), dtype=bool)
+        first[np.unique(keys, return_index=True)[1]] = True
+        bad    = np.flatnonzero((lo == hi) | ~first)
+        if not len(bad):
+            break
+
+        # reshuffle the stubs of the bad pairs together with as many random pairs
+        redo = np.union1d(bad, rng.randint(0, len(pairs), size=len(bad)))
+        s    = pairs[redo].ravel()
+        rng.shuffle(s)
+        pairs[redo] = s.reshape(-1, 2)
+
+    a, b = uniquePairs(pairs[:, 0], pairs[:, 1], n) # drops whatever could not be repaired
+    return Topology.fromUndirected(n, a, b)
+
+def erdosRenyi(n, p, rng):
+    """Undirected G(n, p) graph: every pair of players is connected with probability p"""
+
+    m    = rng.binomial(n*(n-1)//2, p)
+    a, b = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    while len(a) < m:
+        extra = int((m - len(a))*1.1) + 16
+        a, b  = uniquePairs(np.concatenate([a, rng.randint(0, n, extra)]), np.concatenate([b, rng.randint(0, n, extra)]), n)
+
+    keep = np.sort(rng.permutation(len(a))[:m])
+    return Topology.fromUndirected(n, a[keep], b[keep])
+
+def smallWorld(n, k, beta, rng):
+    """Undirected Watts-Strogatz graph: a ring where every player connects to its k/2 nearest players on each
+       side, with every edge rewired to a random player with probability beta"""
+
+    half = max(k//2, 1)
+    a    = np.repeat(np.arange(n, dtype=np.int64), half)
+    b    = (a + np.tile(np.arange(1, half+1), n)) % n
+
+    rewire    = rng.random_sample(len(a)) < beta
+    b[rewire] = rng.randint(0, n, rewire.sum())
+
+    a, b = uniquePairs(a, b, n)
+    return Topology.fromUndirected(n, a, b)
+
+def scaleFree(n, m, rng):
+    """Undirected Barabasi-Albert graph: every new player connects to m existing players chosen proportionally
+       to their degree"""
+
+    m = max(m, 1)
+    if n <= m:
+        raise ValueError("a scale-free graph needs more than %s players" % m)
+
+    a = np.empty((n-m)*m, dtype=np.int64)
+    b = np.empty((n-m)*m, dtype=np.int64)
+    ends  = np.empty(2*(n-m)*m + m, dtype=np.int64) # every edge end; drawing from it is degree-proportional
+    ends[:m] = np.arange(m)
+    nEnds    = m
+
+    draws = rng.random_sample((n-m, 4*m))
+    for i, new in enumerate(range(m, n)):
+        targets = set()
+        for u in draws[i]:
+            targets.add(int(ends[int(u*nEnds)]))
+            if len(targets) == m:
+                break
+        while len(targets) < m: # rare: ran out of pre-drawn numbers
+            targets.add(int(ends[rng.randint(nEnds)]))
+
+        t = np.fromiter(targets, dtype=np.int64, count=m)
+        a[i*m:(i+1)*m] = new
+        b[i*m:(i+1)*m] = t
+        ends[nEnds:nEnds+m]     = t
+        ends[nEnds+m:nEnds+2*m] = new
+        nEnds += 2*m
+
+    return Topology.fromUndirected(n, a, b)
+
+TOPOLOGIES = ("random", "regular", "erdos-renyi", "small-world", "scale-free")
+
+def generate(name, n, k, rng, beta=0.1):
+    """Generates the topology name for n players with (mean) degree k"""
+
+    if name == "random":
+        return randomOut(n, k, rng)
+    if name == "regular":
+        return randomRegular(n, k, rng)
+    if name == "erdos-renyi":
+        return erdosRenyi(n, k/(n-1), rng)
+    if name == "small-world":
+        return smallWorld(n, k, beta, rng)
+    if name == "scale-free":
+        return scaleFree(n, k//2, rng)
+
+    raise ValueError("unknown topology %s; expected one of %s" % (name, ", ".join(TOPOLOGIES)))
@@ -0,0 +1,23 @@
+"""tracedecode.py: decodes a binary trace file written with --tracefile into human-readable lines
+
+Usage:
+  tracedecode.py (--help | -h)
+  tracedecode.py [options] <tracefile>
+
+Options:
+  --times       prefix every line with the heartbeat of the event
+  --help        show this
+"""
+
+import tracer
+
+from docopt import docopt
+
+if __name__=="__main__":
+    args = docopt(__doc__)
+
+    for record in tracer.readRecords(args["<tracefile>"]):
+        line = tracer.formatRecord(record)
+        if args["--times"]:
+            line = "[%s] %s" % (record[1], line.lstrip("\n"))
+        print(line)
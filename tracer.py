@@ -0,0 +1,225 @@
+"""This module defines the Tracer class, which records simulation events (sends, receives, stage transitions, ...).
+
+Every event type has a bit in Tracer.mask; call sites test that bit before building anything, so tracing
+costs a single integer test per event when it is disabled:
+
+    if tracer.mask & Event.SEND:
+        tracer.emit(Event.SEND, heartbeat, player.id, peer.id, msg)
+
+Events are passed to sinks: TextSink prints today's human-readable lines, RingBuffer keeps only the last N
+events in memory, and BinarySink writes fixed-size records that tracedecode.py turns back into text.
+"""
+
+import block
+import message
+import transaction
+
+import collections
+import struct
+import sys
+
+class Event:
+    CONNECT  = 1 << 0 # player is connected to peer
+    PLAYER   = 1 << 1 # player starts its heartbeat
+    ROUND    = 1 << 2 # player starts a new round
+    PROPOSE  = 1 << 3 # player proposed a block
+    PRE_VOTE = 1 << 4 # player moved to the pre vote stage; value is whether the block was valid
+    VOTE     = 1 << 5 # player moved to the vote stage
+    COMMIT   = 1 << 6 # player committed a block
+    VOTES    = 1 << 7 # current pre vote and vote tallies of player; value is (preVotes, votes)
+    SEND     = 1 << 8 # player sent msg to peer
+    RECEIVE  = 1 << 9 # player received msg
+
+    NAMES = {CONNECT: "connect", PLAYER: "player", ROUND: "round", PROPOSE: "propose", PRE_VOTE: "prevote",
+             VOTE: "vote", COMMIT: "commit", VOTES: "votes", SEND: "send", RECEIVE: "receive"}
+
+class Level:
+    OFF   = 0
+    INFO  = 1 # network, rounds, proposals and commits
+    DEBUG = 2 # + stage transitions and vote tallies
+    TRACE = 3 # + every message sent and received
+
+    NAMES = {"off": OFF, "info": INFO, "debug": DEBUG, "trace": TRACE}
+
+LEVELS = {Event.CONNECT: Level.INFO,  Event.ROUND: Level.INFO,  Event.PROPOSE: Level.INFO, Event.COMMIT: Level.INFO,
+          Event.PLAYER: Level.DEBUG,  Event.PRE_VOTE: Level.DEBUG, Event.VOTE: Level.DEBUG, Event.VOTES: Level.DEBUG,
+          Event.SEND: Level.TRACE,    Event.RECEIVE: Level.TRACE}
+
+# binary record: event code, time, player, peer, msg id, msg type, value id, msg sender, fee
+RECORD   = struct.Struct("<BdiiqBqid")
+MAGIC    = b"POSTRACE\x01"
+NO_MSG   = 255 # msg type of events without a message
+
+class Tracer:
+    def __init__(self, level=Level.OFF, events=None):
+        """Creates a Tracer that records all events up to level; events optionally restricts the event types
+           by name (see Event.NAMES)"""
+
+        self.sinks = []
+
+        self.mask = 0
+        for event, name in Event.NAMES.items():
+            if LEVELS[event] <= level and (events is None or name in events):
+                self.mask |= event
+
+    @staticmethod
+    def fromOpts(opts):
+        """Creates a Tracer and its sinks from TRACE_LEVEL, TRACE_EVENTS, TRACE_RING and TRACE_FILE in opts"""
+
+        level = opts.get("TRACE_LEVEL", Level.OFF)
+        if isinstance(level, str):
+            level = Level.NAMES[level.lower()]
+
+        events = opts.get("TRACE_EVENTS")
+        if isinstance(events, str):
+            events = set(events.split(","))
+        if events is not None:
+            unknown = set(events) - set(Event.NAMES.values())
+            if unknown:
+                raise ValueError("unknown trace events %s" % ", ".join(sorted(unknown)))
+
+        tracer = Tracer(level, events)
+        if not tracer.mask:
+            return tracer
+
+        if opts.get("TRACE_RING"):
+            tracer.sinks.append(RingBuffer(opts["TRACE_RING"]))
+        if opts.get("TRACE_FILE"):
+            tracer.sinks.append(BinarySink(opts["TRACE_FILE"]))
+        if not tracer.sinks:
+            tracer.sinks.append(TextSink())
+
+        return tracer
+
+    def emit(self, event, time, player, peer=-1, msg=None, value=None):
+        """Passes an event to all sinks. Call sites check self.mask first"""
+
+        for i in self.sinks:
+            i.write(event, time, player, peer, msg, value)
+
+    def ring(self):
+        """Returns the RingBuffer sink, if any"""
+
+        for i in self.sinks:
+            if isinstance(i, RingBuffer):
+                return i
+        return None
+
+    def close(self):
+        for i in self.sinks:
+            i.close()
+
+def toRecord(event, time, player, peer, msg, value):
+    """Flattens an event into the fields of a binary record"""
+
+    msgId, msgType, valueId, senderId, fee = -1, NO_MSG, -1, -1, 0.0
+
+    if msg is not None:
+        msgId, msgType, senderId = msg.id, msg.type, msg.senderId
+        value = msg.value
+
+    if isinstance(value, transaction.Transaction):
+        valueId, fee = value.id, value.fee
+    elif isinstance(value, block.Block):
+        valueId = value.id
+    elif isinstance(value, bytes): # block digest
+        valueId = int.from_bytes(value[:7], "big")
+    elif isinstance(value, tuple): # vote tallies
+        valueId, senderId = len(value[0]), len(value[1])
+    elif value is not None:
+        valueId = int(value)
+
+    return (event.bit_length()-1, time, player, peer, msgId, msgType, valueId, senderId, fee)
+
+MSG_TYPES = {message.Message.MessageType.TRANSACTION: "tx", message.Message.MessageType.PRE_VOTE: "prevote",
+             message.Message.MessageType.VOTE: "vote", message.Message.MessageType.BLOCK: "block"}
+
+def formatRecord(record):
+    """Formats a binary record as the human-readable line of its event"""
+
+    code, time, player, peer, msgId, msgType, valueId, senderId, fee = record
+    event = 1 << code
+
+    if event == Event.VOTES:
+        return "preVotes: %s blocks\nvotes: %s blocks" % (valueId, senderId)
+
+    if msgType == message.Message.MessageType.TRANSACTION:
+        val = "transaction %s, fee %s" % (valueId, round(fee, 2))
+    else:
+        val = "%014x" % valueId if valueId != -1 else None
+    msg = "message %s; type %s, val %s, sender %s" % (msgId, MSG_TYPES.get(msgType), val, senderId)
+
+    return formatEvent(event, player, peer, msg, valueId)
+
+def formatEvent(event, player, peer, msg, value, extra=None):
+    """Formats an event as a human-readable line; msg is a Message or its string"""
+
+    if event == Event.CONNECT:  return "player %s connected to player %s" % (player, peer)
+    if event == Event.PLAYER:   return "\nplayer %s" % player
+    if event == Event.ROUND:    return "STARTED NEW ROUND"
+    if event == Event.PROPOSE:  return "proposed block %s" % value
+    if event == Event.PRE_VOTE: return "pre pre vote %s; moved to pre vote" % ("valid" if value else "invalid")
+    if event == Event.VOTE:     return "moved to vote stage"
+    if event == Event.COMMIT:   return "committed block %s" % value
+    if event == Event.VOTES:    return "preVotes: %s\nvotes: %s" % (value, extra)
+    if event == Event.SEND:     return "sent %s to player %s" % (msg, peer)
+    if event == Event.RECEIVE:  return "received %s" % msg
+
+class TextSink:
+    """Prints every event as a human-readable line"""
+
+    def __init__(self, stream=None):
+        self.stream = stream if stream is not None else sys.stdout
+
+    def write(self, event, time, player, peer, msg, value):
+        extra = None
+        if isinstance(value, block.Block):
+            value = value.id
+        elif isinstance(value, tuple): # vote tallies
+            value, extra = value
+        self.stream.write(formatEvent(event, player, peer, msg, value, extra) + "\n")
+
+    def close(self):
+        self.stream.flush()
+
+class RingBuffer:
+    """Keeps the last n events as binary records"""
+
+    def __init__(self, n):
+        self.records = collections.deque(maxlen=n)
+
+    def write(self, event, time, player, peer, msg, value):
+        self.records.append(toRecord(event, time, player, peer, msg, value))
+
+    def dump(self, stream=None):
+        stream = stream if stream is not None else sys.stdout
+        for i in self.records:
+            stream.write(formatRecord(i) + "\n")
+
+    def close(self):
+        pass
+
+class BinarySink:
+    """Writes every event as a fixed-size binary record to a trace file"""
+
+    def __init__(self, path):
+        self.file = open(path, "wb")
+        self.file.write(MAGIC)
+
+    def write(self, event, time, player, peer, msg, value):
+        self.file.write(RECORD.pack(*toRecord(event, time, player, peer, msg, value)))
+
+    def close(self):
+        self.file.close()
+
+def readRecords(path):
+    """Yields the records of a trace file written by BinarySink"""
+
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError("%s is not a trace file" % path)
+        while True:
+            data = f.read(RECORD.size)
+            if len(data) < RECORD.size:
+                break
+            yield RECORD.unpack(data)
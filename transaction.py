@@ -1,18 +1,26 @@
 """This module defines the Transaction class, which represents a transaction made between two players.
 """
 
+import hashlib
+import struct
+
 class Transaction:
     id = 0
     
-    def __init__(self, senderId, recipId, fee):
+    def __init__(self, senderId, recipId, fee, id=-1):
         """Creates a new Transaction object, given senderId and recipId"""
         
         self.senderId = senderId # sender id
         self.recipId  = recipId  # recipient id
         self.fee      = fee      # transaction fee
         
-        self.id = Transaction.id
-        Transaction.id += 1
+        if id == -1:
+            self.id = Transaction.id
+            Transaction.id += 1
+        else:
+            self.id = id
+
+        self.digest = hashlib.sha256(struct.pack("<qqqd", self.id, senderId, recipId, fee)).digest() # content hash
 
     def __eq__(self, other):
         if other == None:
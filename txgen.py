@@ -0,0 +1,87 @@
+"""This module defines the TransactionGenerator class, which draws whether each player makes a transaction, and its
+recipient and fee, for all players and a block of heartbeats in one vectorized step.
+
+The draws come from counter-based streams: the k-th number of player i at heartbeat h is a hash (splitmix64) of
+(seed, i, h, k), not the next output of a shared generator. A player's transactions therefore depend only on the
+seed, its id and the heartbeat, whatever order the players run in, in one process or in several (see bsp.py),
+and resuming a snapshot draws the same transactions as the uninterrupted run.
+"""
+
+import transaction
+
+import numpy as np
+
+MASK = (1 << 64) - 1
+
+def mix(x):
+    """splitmix64 of the uint64 array x"""
+
+    x = x + np.uint64(0x9E3779B97F4A7C15)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+def uniform(x):
+    """Maps the uint64 array x to floats in [0, 1)"""
+
+    return (x >> np.uint64(11)).astype(np.float64) * 2.0**-53
+
+class TransactionGenerator:
+    CELLS = 1 << 16 # (heartbeat, player) pairs drawn at once
+
+    def __init__(self, seed, nPlayers, meanFee, stdFee):
+        """Creates a TransactionGenerator for nPlayers players whose fees are max(N(meanFee, stdFee), 0)"""
+
+        self.nPlayers = nPlayers
+        self.meanFee  = meanFee
+        self.stdFee   = stdFee
+        self.chunk    = max(1, self.CELLS // max(nPlayers, 1)) # heartbeats drawn at once
+
+        self.reseed(seed)
+
+    def reseed(self, seed):
+        """Switches to the streams of seed, e.g. to fork a simulation"""
+
+        self.seed = seed & MASK
+
+        self.start      = None # first heartbeat of the drawn block
+        self.arrivals   = None # arrivals[h-start, i]: uniform compared with the probability of a transaction
+        self.recipients = None # recipients[h-start, i]: recipient of player i's transaction at heartbeat h
+        self.fees       = None # fees[h-start, i]: fee of player i's transaction at heartbeat h
+
+    def draw(self, start):
+        """Draws the block of heartbeats starting at start for all players"""
+
+        n = self.nPlayers
+        with np.errstate(over="ignore"):
+            keys = mix(mix(np.array([self.seed], dtype=np.uint64)) + np.arange(n, dtype=np.uint64)) # per player
+            ctrs = mix(keys[None, :] + np.arange(start, start+self.chunk, dtype=np.uint64)[:, None])
+
+            lanes = [uniform(mix(ctrs + np.uint64(k))) for k in range(4)]
+
+        self.start    = start
+        self.arrivals = lanes[0]
+
+        # uniform over the other players
+        recipients = (lanes[1]*max(n-1, 1)).astype(np.int64)
+        if n > 1:
+            recipients += recipients >= np.arange(n)
+        self.recipients = recipients
+
+        # Box-Muller; 1 - u is in (0, 1]
+        normal    = np.sqrt(-2*np.log(1 - lanes[2]))*np.cos(2*np.pi*lanes[3])
+        self.fees = np.maximum(self.meanFee + self.stdFee*normal, 0)
+
+    def get(self, playerId, heartbeat, p):
+        """Returns the transaction player playerId makes at heartbeat, each made with probability p, or None.
+           Ids are heartbeat*nPlayers + playerId, so they are unique and independent of the execution order"""
+
+        if self.start is None or not self.start <= heartbeat < self.start+self.chunk:
+            self.draw(heartbeat - heartbeat % self.chunk)
+
+        h = heartbeat - self.start
+        if self.arrivals[h, playerId] >= p:
+            return None
+
+        return transaction.Transaction(playerId, int(self.recipients[h, playerId]), float(self.fees[h, playerId]),
+                                       heartbeat*self.nPlayers + playerId)